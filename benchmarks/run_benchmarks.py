@@ -0,0 +1,339 @@
+"""
+Benchmarks of the TreeviewDataFrame and WidgetsRender hot paths.
+
+Runs headless: without a DISPLAY a virtual X server (Xvfb) is started for the run.
+The data is generated, no network is needed.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json --threshold 0.2
+
+The times depend on the machine, the Tk build and the X server, so no baseline is kept in the repository:
+save one with --output on the machine the later runs are compared on.
+
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+from tkinter import ttk
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tkextras import WidgetsRender, WidgetPool, TreeviewDataFrame  # noqa: E402
+
+SIZES = (1000, 10000, 100000)
+COLUMNS = (3, 10, 30)
+WIDGETS = (1000, 5000)
+
+
+def start_xvfb() -> subprocess.Popen | None:
+    """
+    Starts a virtual X server when there is no display
+
+    :return: the Xvfb process, None if a display is available
+    """
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        sys.exit("No DISPLAY and no Xvfb found, install Xvfb or run under xvfb-run")
+    for number in range(99, 199):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}") and not os.path.exists(f"/tmp/.X{number}-lock"):
+            break
+    else:
+        sys.exit("No free display number for Xvfb in :99-:198")
+    # a file, not a pipe: the server keeps logging while it runs
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1600x1200x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=log)
+    for _ in range(50):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}") or server.poll() is not None:
+            break
+        time.sleep(0.1)
+    if server.poll() is not None or not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        server.terminate()
+        server.wait()
+        log.seek(0)
+        error = log.read().decode(errors="replace").strip()
+        sys.exit(f"Xvfb :{number} did not start{': ' + error if error else ''}")
+    os.environ["DISPLAY"] = f":{number}"
+    return server
+
+
+def generate(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a dataframe prepared for loading: a name column and flag columns
+
+    :param rows: number of rows
+    :param columns: number of flag columns
+    :param seed: random seed
+    :return: dataframe
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame((rng.random((rows, columns)) > 0.5).astype(int), columns=[f"flag{i}" for i in range(columns)])
+    df["name"] = [f"table_{n:07d}" for n in rng.permutation(rows)]
+    return TreeviewDataFrame.transform_df(df, "name")
+
+
+def measure(function, repeat: int, setup=None) -> list[float]:
+    """
+    Times a function
+
+    :param function: function receiving the result of setup
+    :param repeat: number of runs
+    :param setup: function preparing every run, not timed
+    :return: list of times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        function(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def tree_benchmarks(root: tk.Tk, rows: int, columns: int, repeat: int) -> dict:
+    """
+    Benchmarks of TreeviewDataFrame over one data size
+
+    :param root: Tk root
+    :param rows: number of rows
+    :param columns: number of flag columns
+    :param repeat: number of runs
+    :return: times per operation
+    """
+    df = generate(rows, columns)
+    cols = df.columns.to_list()
+
+    def new_tree():
+        for child in root.winfo_children():
+            child.destroy()
+        frame = ttk.Frame(root)
+        frame.pack()
+        tree = TreeviewDataFrame(frame, columns=cols, show="headings", height=20)
+        tree.pack()
+        root.update()
+        return tree
+
+    def loaded_tree():
+        tree = new_tree()
+        tree.make_tree(df.copy())
+        boxes = tree.checkbox_widget(tree.master)
+        boxes.pack()
+        root.update()
+        return tree, boxes
+
+    def toggle_cells(state):
+        tree, _ = state
+        for item in tree.get_children()[:10]:
+            box = tree.bbox(item, cols[1])
+            if box:
+                x, y, width, height = box
+                tree.toggle_cell(SimpleNamespace(x=x + width // 2, y=y + height // 2))
+
+    def toggle_all(state):
+        _, boxes = state
+        box = boxes.winfo_children()[0]
+        box.invoke()
+        box.invoke()
+
+    def delete(state):
+        tree, _ = state
+        tree.delete(*tree.df.index[::10])
+
+    def redrawn(function):
+        # the time includes the redraw of the window
+        def timed(state):
+            function(state)
+            root.update()
+        return timed
+
+    results = {
+        "make_tree": measure(redrawn(lambda state: state[0].make_tree(state[1])), repeat,
+                             lambda: (new_tree(), df.copy())),
+        "filter_by_name": measure(redrawn(lambda state: state[0].filter_by_name("_00001")), repeat, loaded_tree),
+        "toggle_cell": measure(redrawn(toggle_cells), repeat, loaded_tree),
+        "toggle_all": measure(redrawn(toggle_all), repeat, loaded_tree),
+        "delete_inplace": measure(redrawn(delete), repeat, loaded_tree),
+    }
+    for child in root.winfo_children():
+        child.destroy()
+    return results
+
+
+class Form(WidgetsRender, ttk.Frame):
+    """
+    Form laid out with the WidgetsRender methods
+    """
+
+
+def render_benchmarks(root: tk.Tk, widgets: int, repeat: int) -> dict:
+    """
+    Benchmarks of WidgetsRender over one form size
+
+    :param root: Tk root
+    :param widgets: number of widgets on the form
+    :param repeat: number of runs
+    :return: times per operation
+    """
+    def layout(_):
+        form = Form(dict(sticky="ew", padx=5, pady=2), root)
+        form.pack()
+        for i in range(widgets // 2):
+            form.rgrid(ttk.Label(form, text=f"Field {i}"), dict(row=i, column=0))
+            form.rgrid(ttk.Entry(form), dict(row=i, column=1))
+        root.update()
+        form.destroy()
+
+    def bulk_layout(_):
+        form = Form(dict(sticky="ew", padx=5, pady=2), root)
+        form.pack()
+        form.render_layout([[(ttk.Label, dict(text=f"Field {i}")), ttk.Entry] for i in range(widgets // 2)])
+        root.update()
+        form.destroy()
+
+    def rebuild(pool):
+        # a form rebuilt for 3 records, its widgets are destroyed or pooled between the records
+        def timed(_):
+            form = Form(dict(sticky="ew", padx=5, pady=2), root)
+            form.widget_pool = WidgetPool(widgets) if pool else None
+            form.pack()
+            for record in range(3):
+                form.release(*form.winfo_children())
+                for i in range(widgets // 2):
+                    form.rgrid(ttk.Label, dict(row=i, column=0), options=dict(text=f"Field {i} of {record}"))
+                    form.rgrid(ttk.Entry, dict(row=i, column=1))
+                root.update()
+            form.destroy()
+        return timed
+
+    def prepare(_):
+        form = Form(None, root)
+        for i in range(widgets * 100):
+            form.param_prepare(dict(row=i, column=1), ("grid", "pack", "place")[i % 3])
+        form.destroy()
+
+    return {"rgrid_layout": measure(layout, repeat), "render_layout": measure(bulk_layout, repeat),
+            "rgrid_rebuild": measure(rebuild(False), repeat), "rgrid_rebuild_pooled": measure(rebuild(True), repeat),
+            "param_prepare_x100": measure(prepare, repeat)}
+
+
+IMPORTS = {
+    "import_widgets_render": "from tkextras import WidgetsRender",
+    "import_treeview_dataframe": "from tkextras import TreeviewDataFrame",
+    "import_with_pandas": "from tkextras import TreeviewDataFrame; import pandas.core.api",
+}
+
+
+def import_benchmarks(repeat: int) -> dict:
+    """
+    Import times of the package, every run in a new interpreter (tkinter is imported before the timing)
+
+    :param repeat: number of runs
+    :return: times per import
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for name, statement in IMPORTS.items():
+        code = (f"import sys, time, tkinter; sys.path.insert(0, {root!r}); start = time.perf_counter(); "
+                f"{statement}; print(time.perf_counter() - start)")
+        results[name] = [float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                               check=True).stdout) for _ in range(repeat)]
+    return results
+
+
+def run(sizes, columns, widgets, repeat: int) -> dict:
+    """
+    Runs all benchmarks
+
+    :param sizes: numbers of rows
+    :param columns: numbers of flag columns
+    :param widgets: numbers of form widgets
+    :param repeat: number of runs of every operation
+    :return: report with the environment and the results
+    """
+    root = tk.Tk()
+    results = []
+    for name, times in import_benchmarks(repeat).items():
+        results.append(dict(name=name, rows=0, columns=0, times=times, median=statistics.median(times)))
+        print(f"{name:<26} {results[-1]['median'] * 1000:.2f} ms", flush=True)
+    for rows in sizes:
+        for cols in columns:
+            for name, times in tree_benchmarks(root, rows, cols, repeat).items():
+                results.append(dict(name=name, rows=rows, columns=cols, times=times, median=statistics.median(times)))
+                print(f"{name:<20} rows={rows:<7} columns={cols:<3} {results[-1]['median']:.4f} s", flush=True)
+    for count in widgets:
+        for name, times in render_benchmarks(root, count, repeat).items():
+            results.append(dict(name=name, rows=count, columns=0, times=times, median=statistics.median(times)))
+            print(f"{name:<20} widgets={count:<7} {results[-1]['median']:.4f} s", flush=True)
+    environment = dict(python=platform.python_version(), tk=str(root.tk.call("info", "patchlevel")),
+                       pandas=pd.__version__, numpy=np.__version__, platform=platform.platform(),
+                       timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    root.destroy()
+    return dict(environment=environment, results=results)
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Compares the medians of a report with a saved baseline
+
+    :param report: current results
+    :param baseline: saved results
+    :param threshold: relative slowdown reported as a regression (0.2 - 20 % slower)
+    :return: list of regressions
+    """
+    saved = {(r["name"], r["rows"], r["columns"]): r["median"] for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = saved.get((result["name"], result["rows"], result["columns"]))
+        if not before:
+            continue
+        ratio = result["median"] / before
+        flag = "REGRESSION" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        print(f"{result['name']:<20} rows={result['rows']:<7} columns={result['columns']:<3} "
+              f"{before:.4f} -> {result['median']:.4f} s  x{ratio:.2f} {flag}")
+        if flag == "REGRESSION":
+            regressions.append(dict(result, baseline=before, ratio=ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of rows")
+    parser.add_argument("--columns", type=int, nargs="+", default=COLUMNS, help="numbers of flag columns")
+    parser.add_argument("--widgets", type=int, nargs="+", default=WIDGETS, help="numbers of form widgets")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every operation, the median is reported")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="JSON baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    server = start_xvfb()
+    try:
+        report = run(args.sizes, args.columns, args.widgets, args.repeat)
+    finally:
+        if server:
+            server.terminate()
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
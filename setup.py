@@ -27,5 +27,8 @@ setup(
     install_requires=[
         "pandas>=1.0",
     ],
+    extras_require={
+        "arrow": ["pyarrow"],
+    },
     python_requires=">=3.9",
 )
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tkextras.change_journal import ChangeJournal
+
+
+def cells(iids, column, old, new):
+    return pd.Index(iids, dtype=object), column, np.array(old, dtype=object), np.array(new, dtype=object), "update"
+
+
+def rows(iids, kind):
+    return pd.Index(iids, dtype=object), None, None, None, kind
+
+
+def changes(entries):
+    return sorted(map(tuple, ChangeJournal.net_changes(entries).itertuples(index=False)), key=str)
+
+
+@pytest.fixture
+def journal():
+    df = pd.DataFrame(dict(name=["a", "b", "c"], read=["✔", " ", " "]), index=["I001", "I002", "I003"])
+    journal = ChangeJournal(SimpleNamespace(df=df))
+    journal.checkpoint("start")
+    return journal
+
+
+def test_no_entries():
+    assert list(ChangeJournal.net_changes([]).columns) == ChangeJournal.COLUMNS
+    assert changes([]) == []
+
+
+def test_one_write_reports_changed_cells():
+    assert changes([cells(["I001", "I002", "I003"], "read", ["✔", " ", np.nan], [" ", " ", np.nan])]) == [
+        ("I001", "read", "✔", " ", "update")]
+
+
+def test_cells_keep_first_old_and_last_new_value():
+    entries = [cells(["I001", "I002"], "read", [" ", " "], ["✔", "✔"]), cells(["I001"], "read", ["✔"], ["■"]),
+               cells(["I002"], "read", ["✔"], [" "])]
+    assert changes(entries) == [("I001", "read", " ", "■", "update")]
+
+
+def test_rows_inserted_and_deleted():
+    entries = [rows(["I004", "I005"], "insert"), cells(["I004", "I001"], "read", [" ", " "], ["✔", "✔"]),
+               rows(["I005", "I002"], "delete"), cells(["I002"], "name", ["b"], ["x"])]
+    assert changes(entries) == [("I001", "read", " ", "✔", "update"), ("I002", None, None, None, "delete"),
+                                ("I004", None, None, None, "insert")]
+
+
+def test_row_deleted_and_inserted_again():
+    assert changes([rows(["I001"], "delete"), rows(["I001"], "insert")]) == [
+        ("I001", None, None, None, "delete"), ("I001", None, None, None, "insert")]
+
+
+def test_hooks_record_only_with_checkpoints():
+    df = pd.DataFrame(dict(name=["a"], read=[" "]), index=["I001"])
+    journal = ChangeJournal(SimpleNamespace(df=df))
+    journal.cells_written(1, np.array([0]), np.array([" "], dtype=object), np.array(["✔"], dtype=object))
+    assert not journal.active and journal.entries == []
+    journal.checkpoint("start")
+    journal.cells_written(1, np.array([0]), np.array([" "], dtype=object), np.array(["✔"], dtype=object))
+    assert len(journal.entries) == 1
+
+
+def test_hooks(journal):
+    df = journal.tree.df
+    journal.cells_written(1, np.array([0, 1]), np.array(["✔", " "], dtype=object),
+                          np.array(["✔", "✔"], dtype=object))
+    journal.rows_replaced(df.iloc[[2]].assign(name="z"), df.iloc[[2]])
+    journal.rows_added(pd.DataFrame(dict(name=["d"], read=[" "]), index=["I004"]))
+    journal.rows_removed(df.iloc[[0]])
+    assert changes(journal.entries) == [("I001", None, None, None, "delete"), ("I002", "read", " ", "✔", "update"),
+                                        ("I003", "name", "c", "z", "update"), ("I004", None, None, None, "insert")]
+
+
+def test_entries_are_kept_from_the_oldest_checkpoint(journal):
+    journal.record(*cells(["I001"], "read", ["✔"], [" "])[:4])
+    journal.checkpoint("later")
+    journal.record(*cells(["I002"], "read", [" "], ["✔"])[:4])
+    assert len(journal.since("start")) == 2 and len(journal.since("later")) == 1
+    journal.release("start")
+    assert len(journal.entries) == 1
+    journal.checkpoint("later")
+    assert journal.entries == [] and journal.since("later").empty
+    journal.release("later")
+    with pytest.raises(KeyError):
+        journal.since("later")
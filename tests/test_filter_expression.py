@@ -0,0 +1,119 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tkextras.filter_expression import And, Checked, Contains, Equals, FilterExpression, Matches, Not, Or
+from tkextras.search_index import SearchIndex
+from tkextras.treeview_dataframe import TreeviewDataFrame
+
+
+class Table:
+    """
+    The part of TreeviewDataFrame the expressions read, without a Tk widget
+    """
+    FILTER_CACHE = TreeviewDataFrame.FILTER_CACHE
+    _flags_to_bool = TreeviewDataFrame._flags_to_bool
+    _expression_mask = TreeviewDataFrame._expression_mask
+
+    def __init__(self, df, search_index=False):
+        self.df = df
+        self.svars = dict(flag_symbol=dict(check="✔", uncheck=" "))
+        self.search_index = SearchIndex(df.index, df.iloc[:, 0]) if search_index else None
+        self._filter_cache = {}
+
+
+@pytest.fixture
+def table():
+    return Table(pd.DataFrame(dict(
+        name=["sales_2024", "Sales Archive", "dim_customer", "fact_sales", "Straße"],
+        read=["✔", " ", "✔", "✔", " "],
+        size=[10, 20, 30, 40, 50],
+    ), index=[f"i{i}" for i in range(5)]))
+
+
+def rows(table, expression):
+    if isinstance(expression, str):
+        expression = FilterExpression.parse(expression)
+    return list(table.df.index[expression.mask(table)])
+
+
+def test_parse_builds_predicates():
+    assert FilterExpression.parse('name contains "sales"') == Contains("name", "sales")
+    assert FilterExpression.parse("`read` is checked") == Checked("read")
+    assert FilterExpression.parse("2 IS unchecked") == Checked(2, False)
+    assert FilterExpression.parse("'2' == 30") == Equals("2", "30")
+    assert FilterExpression.parse("name != x") == Not(Equals("name", "x"))
+    assert FilterExpression.parse(r'name matches "^\"a"') == Matches("name", '^"a')
+
+
+def test_parse_precedence():
+    a, b, c = (Contains("name", text) for text in "abc")
+    assert FilterExpression.parse("name contains a or name contains b and name contains c") == Or(a, And(b, c))
+    assert FilterExpression.parse("(name contains a or name contains b) and name contains c") == And(Or(a, b), c)
+    assert FilterExpression.parse("not name contains a and name contains b") == And(Not(a), b)
+
+
+def test_operators_flatten():
+    a, b, c = (Contains("name", text) for text in "abc")
+    assert a & b & c == And(a, b, c)
+    assert (a | b) | c == Or(a, b, c)
+    assert ~a == Not(a)
+    assert And(a, b) != Or(a, b)
+    assert hash(a & b) == hash(And(a, b))
+
+
+@pytest.mark.parametrize("query, message", [
+    ("name contains", "Expected a value at position 13"),
+    ("name is maybe", "Expected checked or unchecked"),
+    ("(name contains a", "Expected ) at position 16"),
+    ("name contains a b", "Expected end"),
+    ("name = a", "Unexpected character at position 4"),
+])
+def test_parse_errors(query, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        FilterExpression.parse(query)
+
+
+def test_invalid_regular_expression():
+    with pytest.raises(ValueError, match="Invalid regular expression"):
+        Matches("name", "(")
+
+
+def test_unhashable_values_are_rejected():
+    with pytest.raises(ValueError, match="one value"):
+        Equals("size", [10, 20])
+    with pytest.raises(ValueError, match="name or a number"):
+        Checked(["read"])
+
+
+def test_masks(table):
+    assert rows(table, 'name contains "sales"') == ["i0", "i1", "i3"]
+    assert rows(table, Contains("name", "Sales", case=True)) == ["i1"]
+    assert rows(table, "name matches '^s'") == ["i0", "i1", "i4"]
+    assert rows(table, "read is checked and not name contains dim") == ["i0", "i3"]
+    assert rows(table, "read is unchecked or size == 30") == ["i1", "i2", "i4"]
+    assert rows(table, "size != 30") == ["i0", "i1", "i3", "i4"]
+    assert rows(table, "size == abc") == []
+    assert rows(table, "1 is checked") == ["i0", "i2", "i3"]
+
+
+def test_contains_folds_case_like_the_search_index(table):
+    indexed = Table(table.df, search_index=True)
+    for text in ("STRASSE", "straße", "SALES"):
+        assert rows(table, Contains("name", text)) == rows(indexed, Contains("name", text))
+    assert rows(table, Contains("name", "strasse")) == ["i4"]
+
+
+def test_unknown_columns(table):
+    with pytest.raises(KeyError):
+        Contains("missing", "x").mask(table)
+    with pytest.raises(KeyError):
+        Checked(7).mask(table)
+
+
+def test_masks_are_cached_by_expression(table):
+    first = table._expression_mask(FilterExpression.parse("read is checked"))
+    assert table._expression_mask(Checked("read")) is first
+    assert np.array_equal(first, [True, False, True, True, False])
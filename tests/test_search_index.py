@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from tkextras.search_index import SearchIndex
+
+NAMES = ["sales_2024", "Sales_Archive", "dim_customer", "fact_sales", "STRASSE", None, 42, "İstanbul"]
+
+
+def unindexed(names, keyword):
+    values = pd.Series(names, dtype=object)
+    found = SearchIndex.fold(values).str.contains(keyword.casefold(), regex=False, na=False)
+    return list(values.index[found.to_numpy(bool)])
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(range(len(NAMES)), NAMES)
+
+
+@pytest.mark.parametrize("keyword", [
+    "sales", "SALES", "ales_", "dim", "sa", "s", "", "straße", "İst", "istan", "xyz",
+])
+def test_search_matches_unindexed_search(index, keyword):
+    assert list(index.search(keyword)) == unindexed(NAMES, keyword)
+
+
+def test_search_keys_in_insertion_order(index):
+    assert list(index.search("sales")) == [0, 1, 3]
+
+
+def test_values_which_are_not_strings_never_match(index):
+    assert 5 not in index.search("none")
+    assert 6 not in index.search("42")
+
+
+def test_add_one_by_one(index):
+    index.add(["new"], ["sales_new"])
+    assert list(index.search("sales")) == [0, 1, 3, "new"]
+    assert "new" in index and len(index) == len(NAMES) + 1
+
+
+def test_large_addition_rebuilds_on_search(index):
+    keys = [f"k{i}" for i in range(100)]
+    index.add(keys, [f"Sales {i}" for i in range(100)])
+    assert index._stale
+    assert list(index.search("sales 9")) == ["k9"] + [f"k{i}" for i in range(90, 100)]
+    assert not index._stale
+
+
+def test_remove_and_update(index):
+    index.remove([0, "unknown"])
+    assert list(index.search("sales")) == [1, 3]
+    index.update([2], ["dim_sales"])
+    assert list(index.search("sales")) == [1, 3, 2]
+    assert list(index.search("customer")) == []
+
+
+def test_refined_search_reuses_previous_matches(index):
+    assert list(index.search("sal")) == [0, 1, 3]
+    assert list(index.search("sales_")) == [0, 1]
+    index.add(["new"], ["sales_new"])
+    assert list(index.search("sales_n")) == ["new"]
+
+
+def test_rebuild_drops_removed_rows():
+    index = SearchIndex(range(20), [f"name{i}" for i in range(20)])
+    index.remove(range(10))
+    assert len(index._keys) == 10
+    assert list(index.search("name1")) == list(range(10, 20))
@@ -0,0 +1,147 @@
+import tkinter as tk
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tkextras import TreeviewDataFrame
+
+CHECK, UNCHECK = "✔", " "
+COLUMNS = ["name", "read", "write"]
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("Tk needs a display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+@pytest.fixture(params=[False, True], ids=["items", "virtual"])
+def tree(root, request):
+    tree = TreeviewDataFrame(root, columns=COLUMNS, show="headings", virtual=request.param)
+    tree.make_tree(pd.DataFrame(dict(
+        name=[f"table_{i}" for i in range(20)],
+        read=[CHECK if i % 2 else UNCHECK for i in range(20)],
+        write=[CHECK if i % 3 else UNCHECK for i in range(20)],
+    )))
+    root.update()
+    return tree
+
+
+def shown(tree):
+    return list(tree.visible_items())
+
+
+def assert_counts(tree):
+    for column in COLUMNS[1:]:
+        for filtered in (False, True):
+            values = tree.snapshot(filtered=filtered)[column]
+            assert tree.checked_count(column, filtered) == int((values == CHECK).sum())
+            assert tree.unchecked_count(column, filtered) == int((values == UNCHECK).sum())
+
+
+def test_delete_removes_rows(tree):
+    deleted = list(tree.df.index[[1, 4]])
+    tree.delete(*deleted)
+    assert not tree.df.index.isin(deleted).any()
+    assert not any(tree.exists(iid) for iid in deleted)
+    assert len(tree.df) == 18 and len(shown(tree)) == 18
+    assert_counts(tree)
+
+
+def test_deleted_rows_stay_deleted(tree):
+    deleted = list(tree.df.index[[1, 4]])
+    tree.filter_by_name("table_1")
+    tree.delete(*deleted)
+    for restore in (tree.reset_filter, lambda: tree.filter_by_name("table"), tree.rebuild_tree):
+        restore()
+        assert len(shown(tree)) == 18
+        assert not set(deleted) & set(shown(tree))
+    assert_counts(tree)
+
+
+def test_deleted_iid_can_be_inserted_again(tree):
+    iid = tree.df.index[3]
+    tree.delete(iid)
+    assert tree.insert("", "end", iid=iid, values=["again", CHECK, CHECK]) == iid
+    assert tree.df.loc[iid, "name"] == "again"
+    assert shown(tree)[-1] == iid
+    assert_counts(tree)
+
+
+def test_counters_follow_changes(tree):
+    tree.filter_by_name("table_1")
+    assert_counts(tree)
+    tree.set(tree.df.index[10], "read", CHECK)
+    tree.set(tree.df.index[11], "write", UNCHECK)
+    assert_counts(tree)
+    tree.set_column("read", UNCHECK)
+    assert_counts(tree)
+    tree.insert("", "end", values=["table_100", CHECK, UNCHECK])
+    tree.delete(tree.df.index[0], tree.df.index[12])
+    assert_counts(tree)
+    with tree.batch():
+        for iid in tree.df.index[:5]:
+            tree.set(iid, "write", CHECK)
+    assert_counts(tree)
+    tree.reset_filter()
+    assert_counts(tree)
+    tree.set_column("write", CHECK, rows="all")
+    assert tree.unchecked_count("write") == 0 and tree.is_all_checked(2)
+
+
+def test_filter_masks_follow_deletes(tree):
+    tree.filter_by("read is checked")
+    tree.delete(*tree.df.index[:6])
+    assert list(tree.filtered_df.index) == list(tree.df.index[np.asarray(tree.df["read"] == CHECK)])
+    assert len(shown(tree)) == len(tree.filtered_df)
+    assert_counts(tree)
+
+
+def test_virtual_selection_and_focus_survive_scrolling(root):
+    tree = TreeviewDataFrame(root, columns=COLUMNS, show="headings", virtual=True)
+    tree.make_tree(pd.DataFrame(dict(name=[f"table_{i}" for i in range(1000)], read=UNCHECK, write=UNCHECK)))
+    root.update()
+    iids = tree.df.index
+    tree.selection_set(iids[2], iids[15])
+    tree.focus(iids[2])
+    tree.yview_moveto(0.5)
+    assert not tree.exists(iids[2])
+    tree.selection_add(iids[500])
+    assert tree.selection() == (iids[2], iids[15], iids[500])
+    tree.yview_moveto(0)
+    assert set(tree.tk.splitlist(tree.tk.call(tree._w, "selection"))) == {iids[2], iids[15]}
+    assert tree.focus() == iids[2]
+    assert list(tree.mark_selected("read")) == [iids[2], iids[15], iids[500]]
+    assert tree.checked_count("read") == 3
+    tree.delete(iids[2])
+    assert tree.selection() == (iids[15], iids[500]) and tree.focus() == ""
+
+
+def test_changes_since_checkpoint(tree):
+    iids = tree.df.index
+    tree.set(iids[0], "name", "renamed")
+    tree.checkpoint()
+    tree.set(iids[1], "read", UNCHECK)
+    tree.set(iids[2], "read", CHECK)
+    tree.set(iids[2], "read", UNCHECK)
+    tree.set_column("write", CHECK, rows=iids[3:7])
+    with tree.batch():
+        tree.item(iids[8], values=["table_8", CHECK, CHECK])
+    added = tree.insert("", "end", values=["new", CHECK, UNCHECK])
+    tree.set(added, "read", UNCHECK)
+    tree.delete(iids[9])
+    changes = tree.changes_since()
+    assert sorted(map(tuple, changes[changes.change == "update"][["iid", "column", "old", "new"]].to_numpy())) == [
+        (iids[1], "read", CHECK, UNCHECK), (iids[3], "write", UNCHECK, CHECK), (iids[6], "write", UNCHECK, CHECK),
+        (iids[8], "read", UNCHECK, CHECK)]
+    assert list(changes[changes.change == "insert"].iid) == [added]
+    assert list(changes[changes.change == "delete"].iid) == [iids[9]]
+    tree.release_checkpoint()
+    with pytest.raises(KeyError):
+        tree.changes_since()
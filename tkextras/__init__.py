@@ -1,5 +1,32 @@
+"""
+The submodules are imported on first use of their classes: WidgetsRender alone does not load pandas.
 
-from .widgets_render import WidgetsRender
-from .treeview_dataframe import TreeviewDataFrame
+"""
+import importlib
 
-__all__ = ["WidgetsRender", "TreeviewDataFrame"]
+__all__ = ["WidgetsRender", "WidgetPool", "TreeviewDataFrame", "DataFrameModel", "FilterExpression", "Contains",
+           "Matches", "Equals", "Checked"]
+
+_MODULES = {
+    "WidgetsRender": ".widgets_render",
+    "WidgetPool": ".widget_pool",
+    "TreeviewDataFrame": ".treeview_dataframe",
+    "DataFrameModel": ".dataframe_model",
+    "FilterExpression": ".filter_expression",
+    "Contains": ".filter_expression",
+    "Matches": ".filter_expression",
+    "Equals": ".filter_expression",
+    "Checked": ".filter_expression",
+}
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,211 @@
+"""
+Contains the implementation of the class ChangeJournal
+
+"""
+from __future__ import annotations
+
+from typing import Literal
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class ChangeJournal:
+    """
+    Record of the changes of the data of a TreeviewDataFrame, behind checkpoint() and changes_since()
+    and the payload of the coalesced events (event_changes()).
+
+    An entry is (iids, column, old, new, kind): the cells of one column written by one operation,
+    or rows inserted or deleted (column None). The tree passes every change to the hooks (rows_added(),
+    rows_replaced(), rows_removed(), cells_written()), they record it only while checkpoints exist or while
+    the changes of the events are collected. Entries are kept from the oldest checkpoint on and combined into
+    net changes only when they are asked for, so the cost depends on the number of changes, not on the size
+    of the table.
+
+    """
+    COLUMNS = ["iid", "column", "old", "new", "change"]
+
+    def __init__(self, tree, collect: bool = False):
+        """
+        Initialization of the journal
+
+        :param tree: TreeviewDataFrame whose changes are recorded
+        :param collect: also collect the changes for the coalesced events (events="idle" of the tree)
+        """
+        self.tree = tree
+        self.collect = collect
+        self.entries = []
+        self.start = 0
+        self.checkpoints = {}
+        self.collected = []
+
+    @property
+    def active(self) -> bool:
+        """
+        Changes are recorded, for the checkpoints or for the coalesced events
+
+        :return: True if the hooks record the changes
+        """
+        return bool(self.checkpoints) or self.collect
+
+    def record(self, iids: pd.Index, column: str | None, old: np.ndarray | None, new: np.ndarray | None,
+               kind: Literal["update", "insert", "delete"] = "update"):
+        """
+        Appends changes to the entries kept for the checkpoints and to the changes collected for the events
+
+        :param iids: rows
+        :param column: changed column, None for inserted and deleted rows
+        :param old: previous values of the cells
+        :param new: new values of the cells
+        :param kind: "update" for cells, "insert" or "delete" for rows
+        :return: None
+        """
+        if not len(iids):
+            return
+        if self.checkpoints:
+            self.entries.append((iids, column, old, new, kind))
+        if self.collect:
+            self.collected.append((iids, column, old, new, kind))
+            self.tree._event_schedule()
+
+    def rows_added(self, frame: pd.DataFrame):
+        """
+        Hook: rows appended to the data
+
+        :param frame: the new rows
+        :return: None
+        """
+        if self.active:
+            self.record(frame.index, None, None, None, "insert")
+
+    def rows_replaced(self, added: pd.DataFrame, removed: pd.DataFrame):
+        """
+        Hook: rows given new values in place, recorded as changed cells
+
+        :param added: new state of the rows
+        :param removed: previous state of the rows, with the same index
+        :return: None
+        """
+        if not self.active:
+            return
+        for column in removed.columns:
+            old, new = removed[column].to_numpy(), added[column].to_numpy()
+            changed = (old != new) & ~(pd.isna(old) & pd.isna(new))
+            self.record(removed.index[changed], column, old[changed], new[changed])
+
+    def rows_removed(self, removed: pd.DataFrame):
+        """
+        Hook: rows deleted from the data
+
+        :param removed: the deleted rows
+        :return: None
+        """
+        if self.active:
+            self.record(removed.index, None, None, None, "delete")
+
+    def cells_written(self, index: int, positions: np.ndarray, old: np.ndarray, values: np.ndarray):
+        """
+        Hook: cells written to one column
+
+        :param index: column number
+        :param positions: row positions in the data
+        :param old: previous values
+        :param values: new values
+        :return: None
+        """
+        if self.active:
+            changed = old != values
+            self.record(self.tree.df.index[positions][changed], self.tree.df.columns[index], old[changed],
+                        values[changed])
+
+    def checkpoint(self, name: str):
+        """
+        Marks the current end of the entries, setting an existing checkpoint again moves it
+
+        :param name: name of the checkpoint
+        :return: None
+        """
+        self.checkpoints[name] = self.start + len(self.entries)
+        self.trim()
+
+    def release(self, name: str):
+        """
+        Removes a checkpoint, unknown names are ignored
+
+        :param name: name of the checkpoint
+        :return: None
+        """
+        self.checkpoints.pop(name, None)
+        self.trim()
+
+    def since(self, name: str) -> pd.DataFrame:
+        """
+        Net changes recorded after the checkpoint
+
+        :param name: name of the checkpoint
+        :return: changes with the columns of COLUMNS
+        """
+        if name not in self.checkpoints:
+            raise KeyError(f"Checkpoint '{name}' not found.")
+        return self.net_changes(self.entries[self.checkpoints[name] - self.start:])
+
+    def trim(self):
+        """
+        Drops the entries older than the oldest checkpoint
+
+        :return: None
+        """
+        end = self.start + len(self.entries)
+        oldest = min(self.checkpoints.values(), default=end)
+        del self.entries[:oldest - self.start]
+        self.start = oldest
+
+    @classmethod
+    def net_changes(cls, entries: list[tuple]) -> pd.DataFrame:
+        """
+        Net changes of recorded entries: one row per inserted or deleted row,
+        one row per changed cell with its first old and last new value.
+        A row inserted and deleted again is left out, as well as cells written back to their first value
+        and the cells of rows inserted or deleted.
+
+        :param entries: recorded changes, oldest first
+        :return: changes with the columns iid, column, old, new, change ("update", "insert" or "delete")
+        """
+        columns = cls.COLUMNS
+        parts = []
+        rows = [(iids, kind) for iids, column, _, _, kind in entries if column is None]
+        touched = pd.Index([], dtype=object)
+        if rows:
+            events = pd.DataFrame(dict(iid=np.concatenate([np.asarray(iids, dtype=object) for iids, _ in rows]),
+                                       change=np.concatenate([np.full(len(iids), kind) for iids, kind in rows])))
+            ends = events.groupby("iid", sort=False)["change"].agg(["first", "last"])
+            touched = ends.index
+            # a row deleted first existed at the checkpoint, a row inserted last exists now
+            for kind, selected in (("delete", ends["first"] == "delete"), ("insert", ends["last"] == "insert")):
+                iids = ends.index[selected.to_numpy()]
+                parts.append(pd.DataFrame(dict(iid=iids, column=None, old=None, new=None, change=kind),
+                                          columns=columns))
+        cells = [(iids, column, old, new) for iids, column, old, new, _ in entries if column is not None]
+        if len(cells) == 1 and not rows:
+            # one vectorized write: its rows are distinct, nothing to combine
+            iids, column, old, new = cells[0]
+            changed = (old != new) & ~(pd.isna(old) & pd.isna(new))
+            parts.append(pd.DataFrame(dict(iid=np.asarray(iids, dtype=object)[changed], column=column,
+                                           old=np.asarray(old, dtype=object)[changed],
+                                           new=np.asarray(new, dtype=object)[changed], change="update"),
+                                      columns=columns))
+        elif cells:
+            changes = pd.DataFrame(dict(
+                iid=np.concatenate([np.asarray(iids, dtype=object) for iids, _, _, _ in cells]),
+                column=np.concatenate([np.full(len(iids), column, dtype=object) for iids, column, _, _ in cells]),
+                old=np.concatenate([np.asarray(old, dtype=object) for _, _, old, _ in cells]),
+                new=np.concatenate([np.asarray(new, dtype=object) for _, _, _, new in cells])))
+            changes = changes[~changes["iid"].isin(touched)]
+            changes = changes.groupby(["iid", "column"], sort=False).agg(old=("old", "first"), new=("new", "last"))
+            changes = changes.reset_index()
+            changed = (changes["old"] != changes["new"]) & ~(changes["old"].isna() & changes["new"].isna())
+            parts.append(changes[changed].assign(change="update"))
+        parts = [part for part in parts if len(part)]
+        return pd.concat(parts, ignore_index=True)[columns] if parts else pd.DataFrame(columns=columns)
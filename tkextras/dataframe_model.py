@@ -0,0 +1,96 @@
+"""
+Contains the implementation of the class DataFrameModel
+
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Iterable, Literal
+
+from tkextras.lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class DataFrameModel:
+    """
+    Data shared by several TreeviewDataFrame views: one dataframe indexed by iid and the change notifications.
+
+        model = DataFrameModel(["name", "read", "write", "admin"])
+        rights = TreeviewDataFrame(frame, model=model, columns=["name", "read", "write"], show="headings")
+        admins = TreeviewDataFrame(frame, model=model, columns=["name", "admin"], show="headings")
+        rights.make_tree(df)
+
+    Every view shows its own subset of the model columns (the displaycolumns of the Treeview) and keeps its own
+    filter, sort, grouping, virtual mode, search index, checkpoints and "check all" boxes, while self.df of
+    all views is the one dataframe of the model. Loading, inserting, writing and deleting rows work through
+    any view. The other views receive the change as a targeted update: their counters and caches follow,
+    only the Tk items of the changed rows are touched, and they generate <<TreeModelChanged>>.
+    A batch() of a view passes its writes on when it applies them.
+
+    """
+    def __init__(self, columns: Iterable[str], flags: Literal["symbol", "bool"] = "symbol"):
+        """
+        Initialization of the model
+
+        :param columns: the columns of the data, the first one holds the names, the others the flags
+        :param flags: storage of the flag columns, used by all views (see TreeviewDataFrame)
+        """
+        self.columns = list(columns)
+        self.flags = flags
+        self.df = pd.DataFrame(columns=self.columns)
+        if flags == "bool":
+            self.df = self.df.astype(dict.fromkeys(self.columns[1:], bool))
+        self.views = []
+        self._iid_serial = 0
+        self._iid_lock = threading.Lock()
+        self._changes = deque()
+
+    def attach(self, view):
+        """
+        Adds a view, called by TreeviewDataFrame(model=...)
+
+        :param view: TreeviewDataFrame over all columns of the model
+        :return: None
+        """
+        if list(view.cget("columns")) != self.columns:
+            raise ValueError("The columns of the view differ from the columns of the model")
+        if view not in self.views:
+            self.views.append(view)
+
+    def detach(self, view):
+        """
+        Removes a view, it stops receiving the changes; called when the view is destroyed
+
+        :param view: TreeviewDataFrame
+        :return: None
+        """
+        if view in self.views:
+            self.views.remove(view)
+
+    def notify(self, source, handler: str, *args):
+        """
+        Takes over the dataframe of the view a change was made through and passes the change to the other views.
+        A change made by an event handler while the views are being updated is passed on after the current one,
+        so every view receives the changes in order.
+
+        :param source: view holding the changed dataframe
+        :param handler: method of the ModelSync of the views applying the change ("receive_cells" or "receive_rows")
+        :param args: arguments of the handler after the dataframe
+        :return: None
+        """
+        self.df = source.df
+        self._changes.append((source, self.df, handler, args))
+        if len(self._changes) > 1:
+            return
+        try:
+            while self._changes:
+                source, df, handler, args = self._changes[0]
+                for view in list(self.views):
+                    if view is not source:
+                        getattr(view._model_sync, handler)(df, *args)
+                self._changes.popleft()
+        except BaseException:
+            self._changes.clear()
+            raise
@@ -0,0 +1,349 @@
+"""
+Contains the implementation of the class FilterExpression and its predicates
+
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any
+
+from tkextras.lazy_import import lazy_import
+from tkextras.search_index import SearchIndex
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class FilterExpression:
+    """
+    Row filter of a TreeviewDataFrame over any of its columns, see TreeviewDataFrame.filter_by().
+    Predicates (Contains, Matches, Equals, Checked) are combined with & (and), | (or) and ~ (not):
+
+        Contains("name", "sales") & Checked(3) & ~Checked(5)
+
+    or parsed from the query language:
+
+        name contains "sales" and 3 is checked and not 5 is checked
+
+    A column is a name, a `quoted name` or a column number. Values are "quoted" or single words.
+    Conditions: contains, matches (regular expression), == and !=, is checked, is unchecked,
+    combined with and, or, not and parentheses. Keywords are case-insensitive.
+
+    Expressions are immutable and hashable, equal expressions share the cached masks of the tree.
+
+    """
+    def __and__(self, other: "FilterExpression") -> "FilterExpression":
+        return And(self, other)
+
+    def __or__(self, other: "FilterExpression") -> "FilterExpression":
+        return Or(self, other)
+
+    def __invert__(self) -> "FilterExpression":
+        return Not(self)
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash((type(self).__name__, self._key()))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(map(repr, self._key()))})"
+
+    def _key(self) -> tuple:
+        """
+        Values identifying the expression
+
+        :return: tuple of hashable values
+        """
+        raise NotImplementedError
+
+    def columns(self) -> set:
+        """
+        Columns the expression reads
+
+        :return: set of column names or numbers, as given
+        """
+        raise NotImplementedError
+
+    def mask(self, tree) -> np.ndarray:
+        """
+        Vectorized evaluation over all rows of the tree
+
+        :param tree: TreeviewDataFrame
+        :return: boolean array aligned with tree.df rows
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(text: str) -> "FilterExpression":
+        """
+        Compiles a query into an expression, the results are cached by the query text
+
+        :param text: query, see the class description
+        :return: expression
+        """
+        return _parse(text)
+
+
+class _Predicate(FilterExpression):
+    """
+    Condition on the values of one column
+    """
+    def __init__(self, column: str | int):
+        try:
+            hash(column)
+        except TypeError:
+            raise ValueError(f"A column is a name or a number, got {type(column).__name__} {column!r}") from None
+        self.column = column
+
+    def _key(self) -> tuple:
+        return tuple(self.__dict__.values())
+
+    def columns(self) -> set:
+        return {self.column}
+
+    def _values(self, tree) -> pd.Series:
+        """
+        Values of the column in tree.df
+
+        :param tree: TreeviewDataFrame
+        :return: column
+        """
+        columns = tree.df.columns
+        if isinstance(self.column, int):
+            if not 0 <= self.column < len(columns):
+                raise KeyError(f"Column {self.column} not found in DataFrame.")
+            return tree.df.iloc[:, self.column]
+        if self.column not in columns:
+            raise KeyError(f"Column '{self.column}' not found in DataFrame.")
+        return tree.df[self.column]
+
+    @staticmethod
+    def _text(values: pd.Series) -> pd.Series:
+        """
+        The values as text for the string methods
+
+        :param values: column
+        :return: column of strings (missing values stay missing)
+        """
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            return values
+        return values.astype(str)
+
+
+class Contains(_Predicate):
+    """
+    The column contains the text, case-insensitive by default
+    """
+    def __init__(self, column: str | int, text: str, case: bool = False):
+        super().__init__(column)
+        self.text = text
+        self.case = case
+
+    def mask(self, tree) -> np.ndarray:
+        values = self._values(tree)
+        if tree.search_index is not None and not self.case and values.name == tree.df.columns[0]:
+            mask = np.zeros(len(tree.df), dtype=bool)
+            positions = tree.df.index.get_indexer(tree.search_index.search(self.text))
+            mask[positions[positions >= 0]] = True
+            return mask
+        values = self._text(values)
+        if self.case:
+            return values.str.contains(self.text, regex=False, na=False).to_numpy(bool)
+        return SearchIndex.fold(values).str.contains(self.text.casefold(), regex=False, na=False).to_numpy(bool)
+
+
+class Matches(_Predicate):
+    """
+    The column matches the regular expression (searched anywhere in the value), case-insensitive by default
+    """
+    def __init__(self, column: str | int, pattern: str, case: bool = False):
+        super().__init__(column)
+        self.pattern = pattern
+        self.case = case
+        try:
+            re.compile(pattern)
+        except re.error as error:
+            raise ValueError(f"Invalid regular expression {pattern!r}: {error}") from None
+
+    def mask(self, tree) -> np.ndarray:
+        values = self._text(self._values(tree))
+        return values.str.contains(self.pattern, case=self.case, regex=True, na=False).to_numpy(bool)
+
+
+class Equals(_Predicate):
+    """
+    The column equals the value. A text value is compared as a number with numeric columns.
+    Flag columns are better tested with Checked, whatever storage the tree uses.
+    The value is one scalar (expressions are hashable), lists and other unhashable values raise ValueError.
+    """
+    def __init__(self, column: str | int, value: Any):
+        super().__init__(column)
+        try:
+            hash(value)
+        except TypeError:
+            raise ValueError(f"Equals compares with one value, got {type(value).__name__} {value!r}") from None
+        self.value = value
+
+    def mask(self, tree) -> np.ndarray:
+        values, value = self._values(tree), self.value
+        if isinstance(value, str) and pd.api.types.is_numeric_dtype(values) \
+                and not pd.api.types.is_bool_dtype(values):
+            try:
+                value = float(value)
+            except ValueError:
+                return np.zeros(len(values), dtype=bool)
+        return (values == value).to_numpy(bool)
+
+
+class Checked(_Predicate):
+    """
+    The flag of the column is checked (or unchecked, with checked=False)
+    """
+    def __init__(self, column: str | int, checked: bool = True):
+        super().__init__(column)
+        self.checked = checked
+
+    def mask(self, tree) -> np.ndarray:
+        checked = tree._flags_to_bool(self._values(tree))
+        return checked if self.checked else ~checked
+
+
+class And(FilterExpression):
+    """
+    All operands hold
+    """
+    ufunc = "logical_and"
+
+    def __init__(self, *operands: FilterExpression):
+        self.operands = tuple(
+            part for operand in operands for part in (operand.operands if type(operand) is type(self) else (operand,)))
+
+    def _key(self) -> tuple:
+        return self.operands
+
+    def columns(self) -> set:
+        return set().union(*(operand.columns() for operand in self.operands))
+
+    def mask(self, tree) -> np.ndarray:
+        return getattr(np, self.ufunc).reduce([tree._expression_mask(operand) for operand in self.operands])
+
+
+class Or(And):
+    """
+    Any operand holds
+    """
+    ufunc = "logical_or"
+
+
+class Not(FilterExpression):
+    """
+    The operand does not hold
+    """
+    def __init__(self, operand: FilterExpression):
+        self.operand = operand
+
+    def _key(self) -> tuple:
+        return self.operand,
+
+    def columns(self) -> set:
+        return self.operand.columns()
+
+    def mask(self, tree) -> np.ndarray:
+        return ~tree._expression_mask(self.operand)
+
+
+_TOKENS = re.compile(r"""\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<quoted>`[^`]*`)
+    |(?P<symbol>==|!=|\(|\))
+    |(?P<word>[^\s()"'`=!]+)
+    )""", re.VERBOSE)
+_KEYWORDS = frozenset(("and", "or", "not", "contains", "matches", "is", "checked", "unchecked"))
+
+
+@lru_cache(maxsize=256)
+def _parse(text: str) -> FilterExpression:
+    """
+    Recursive descent parser of the query language:
+        expression := term ("or" term)*
+        term       := factor ("and" factor)*
+        factor     := "not" factor | "(" expression ")" | column condition
+        condition  := "contains" value | "matches" value | "==" value | "!=" value | "is" ("checked" | "unchecked")
+
+    :param text: query
+    :return: expression
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKENS.match(text, position)
+        if match is None or not match.lastgroup:
+            raise ValueError(f"Unexpected character at position {position} in filter {text!r}")
+        kind, value = match.lastgroup, match.group(match.lastgroup)
+        if kind == "string":
+            kind, value = "text", re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "quoted":
+            kind, value = "text", value[1:-1]
+        elif kind == "word" and value.lower() in _KEYWORDS:
+            kind, value = "keyword", value.lower()
+        tokens.append((kind, value, match.start(match.lastgroup)))
+        position = match.end()
+    tokens.append(("end", "", len(text)))
+    position = 0
+
+    def peek(*expected: str) -> bool:
+        kind, value, _ = tokens[position]
+        return (value if kind in ("keyword", "symbol") else kind) in expected
+
+    def take(*expected: str) -> str:
+        nonlocal position
+        kind, value, start = tokens[position]
+        if not peek(*expected):
+            found = f"'{value}'" if kind != "end" else "the end"
+            expected = dict.fromkeys("a value" if name in ("word", "text") else name for name in expected)
+            raise ValueError(f"Expected {' or '.join(expected)} at position {start} in filter {text!r}, found {found}")
+        position += 1
+        return value
+
+    def expression() -> FilterExpression:
+        operands = [term()]
+        while peek("or"):
+            take("or")
+            operands.append(term())
+        return Or(*operands) if len(operands) > 1 else operands[0]
+
+    def term() -> FilterExpression:
+        operands = [factor()]
+        while peek("and"):
+            take("and")
+            operands.append(factor())
+        return And(*operands) if len(operands) > 1 else operands[0]
+
+    def factor() -> FilterExpression:
+        if peek("not"):
+            take("not")
+            return Not(factor())
+        if peek("("):
+            take("(")
+            result = expression()
+            take(")")
+            return result
+        # a bare number is a column number, a quoted one is a column name
+        column = int(take("word")) if peek("word") and tokens[position][1].isdigit() else take("word", "text")
+        condition = take("contains", "matches", "==", "!=", "is")
+        if condition == "is":
+            return Checked(column, take("checked", "unchecked") == "checked")
+        value = take("word", "text")
+        if condition == "contains":
+            return Contains(column, value)
+        if condition == "matches":
+            return Matches(column, value)
+        return Equals(column, value) if condition == "==" else Not(Equals(column, value))
+
+    result = expression()
+    take("end")
+    return result
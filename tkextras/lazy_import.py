@@ -0,0 +1,28 @@
+"""
+Contains the implementation of the function lazy_import
+
+"""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Module which is executed on the first access to one of its attributes (importlib.util.LazyLoader).
+    An already imported module is returned as is, the lazy module is registered in sys.modules,
+    so every later import of the name shares it.
+
+    :param name: full module name, e.g. "pandas"
+    :return: module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,160 @@
+"""
+Contains the implementation of the class ModelSync
+
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Literal
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class ModelSync:
+    """
+    Link of a TreeviewDataFrame view to its DataFrameModel.
+
+    As a collaborator of the tree it receives every change of the dataframe through the hooks (rows_added(),
+    rows_replaced(), rows_removed(), cells_written()) and passes it to the other views with model.notify().
+    The other views apply it with receive_cells() and receive_rows(): their counters, caches and display mode
+    follow through the hooks of the tree, only the Tk items of the changed rows are touched. The hooks of the
+    kind of change being received do not pass it back; other changes made meanwhile (a batch of the view
+    applied while its rows are shown again) are passed on as usual.
+
+    """
+    def __init__(self, tree, model):
+        """
+        Initialization of the link
+
+        :param tree: TreeviewDataFrame, a view of the model
+        :param model: DataFrameModel
+        """
+        self.tree = tree
+        self.model = model
+        self.receiving = None
+
+    def notify(self, handler: str, *args):
+        """
+        Passes a change of the dataframe of the tree to the other views
+
+        :param handler: method of the other links applying the change
+        :param args: arguments of the handler after the dataframe
+        :return: None
+        """
+        self.model.notify(self.tree, handler, *args)
+
+    def rows_added(self, frame: pd.DataFrame):
+        """
+        Hook: rows appended to the data
+
+        :param frame: the new rows
+        :return: None
+        """
+        if self.receiving != "rows":
+            self.notify("receive_rows", frame, None)
+
+    def rows_replaced(self, added: pd.DataFrame, removed: pd.DataFrame):
+        """
+        Hook: rows given new values in place
+
+        :param added: new state of the rows
+        :param removed: previous state of the rows, with the same index
+        :return: None
+        """
+        if self.receiving != "rows":
+            self.notify("receive_rows", added, removed)
+
+    def rows_removed(self, removed: pd.DataFrame):
+        """
+        Hook: rows deleted from the data
+
+        :param removed: the deleted rows
+        :return: None
+        """
+        if self.receiving != "rows":
+            self.notify("receive_rows", None, removed)
+
+    def cells_written(self, index: int, positions: np.ndarray, old: np.ndarray, values: np.ndarray):
+        """
+        Hook: cells written to one column
+
+        :param index: column number
+        :param positions: row positions in the data
+        :param old: previous values
+        :param values: new values
+        :return: None
+        """
+        if self.receiving != "cells":
+            self.notify("receive_cells", positions, index, old, values)
+
+    @contextmanager
+    def received(self, kind: Literal["rows", "cells"]):
+        """
+        A change received from another view is being applied, the hooks of its kind do not pass it back
+
+        :param kind: "rows" or "cells"
+        :return: None
+        """
+        self.receiving = kind
+        try:
+            yield
+        finally:
+            self.receiving = None
+
+    def receive_cells(self, df: pd.DataFrame, positions: np.ndarray, index: int, old: np.ndarray,
+                      values: np.ndarray):
+        """
+        Cells of one column written through another view: the counters, caches and group flags follow,
+        only the Tk cells of rendered rows are rewritten
+
+        :param df: dataframe of the model
+        :param positions: row positions
+        :param index: column number
+        :param old: previous values, in the storage form
+        :param values: new values, in the storage form
+        :return: None
+        """
+        tree = self.tree
+        tree.df = df
+        with self.received("cells"):
+            tree._cells_written(index, positions, old, values)
+        rendered = tree._rendered_mask(positions)
+        if rendered.any():
+            shown = values[rendered]
+            if tree._flags == "bool" and index:
+                shown = tree._flags_to_symbols(shown)
+            tree._tcl_bulk("set_cells", df.columns[index], df.index[positions[rendered]], shown)
+        tree.all_checked_update(index)
+        tree._event("<<TreeModelChanged>>")
+
+    def receive_rows(self, df: pd.DataFrame, added: pd.DataFrame | None, removed: pd.DataFrame | None):
+        """
+        Rows appended, replaced or deleted through another view.
+        Appended rows are shown as inserted, as with insert(); replaced rows get their new values in place.
+
+        :param df: dataframe of the model
+        :param added: new state of the rows, None for deleted rows
+        :param removed: previous state of the rows, None for appended rows
+        :return: None
+        """
+        tree = self.tree
+        tree._loader.flush()
+        if removed is None:
+            tree.df = df
+            with self.received("rows"):
+                tree._rows_appended(added)
+        elif added is None:
+            positions = tree.df.index.get_indexer(removed.index)
+            with self.received("rows"):
+                tree._rows_removed(positions[positions >= 0], df)
+        else:
+            tree.df = df
+            with self.received("rows"):
+                tree._rows_replaced(added, removed)
+            rendered = added.index[tree._rendered_mask(df.index.get_indexer(added.index))]
+            tree._tcl_bulk("set_items", "-values", rendered, tree._display_rows(added.loc[rendered]))
+        tree.all_checked_update()
+        tree._event("<<TreeModelChanged>>")
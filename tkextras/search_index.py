@@ -0,0 +1,253 @@
+"""
+Contains the implementation of the class SearchIndex
+
+"""
+from __future__ import annotations
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class SearchIndex:
+    """
+    Case-insensitive substring index over a text column, used by TreeviewDataFrame.filter_by_name.
+    Texts and keywords are compared after str.casefold() (see fold()), as the unindexed search does.
+    Keeps a case-folded copy of the texts and a trigram inverted index over them.
+    A search looks up the trigrams of the keyword, intersects their postings
+    and verifies only the remaining candidates.
+
+    The bulk of the postings is a sorted table built in one vectorized pass,
+    rows added later go to a small per-trigram dictionary and removed rows are marked dead,
+    the table is rebuilt when these changes grow beyond REBUILD_RATIO of the index.
+    Larger additions (e.g. chunks of a streamed load) are only stored, the table is rebuilt on the next search.
+
+    """
+    REBUILD_RATIO = 0.1
+    CHUNK = 4096
+
+    def __init__(self, keys=(), texts=()):
+        """
+        Initialization of the index
+
+        :param keys: row identifiers (iids)
+        :param texts: texts of the rows, in the order of keys
+        """
+        self._empty = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=object)
+        self._texts = np.empty(0, dtype=object)
+        self._alive = np.empty(0, dtype=bool)
+        self._pending = []
+        self._codes = {}
+        self._grams = self._empty
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._rows = self._empty
+        self._extra = {}
+        self._changes = 0
+        self._version = 0
+        self._last = None
+        self._stale = False
+        if len(keys):
+            self.add(keys, texts)
+            self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __contains__(self, key) -> bool:
+        return key in self._codes
+
+    def add(self, keys, texts):
+        """
+        Adds rows to the index
+
+        :param keys: row identifiers
+        :param texts: texts of the rows
+        :return: None
+        """
+        keys = list(keys)
+        folded = self._fold(texts)
+        self._version += 1
+        if len(keys) > self.REBUILD_RATIO * len(self._codes):
+            self._consolidate()
+            code = len(self._keys)
+            self._keys = np.concatenate([self._keys, np.asarray(keys, dtype=object)])
+            self._texts = np.concatenate([self._texts, np.asarray(folded, dtype=object)])
+            self._alive = np.concatenate([self._alive, np.ones(len(keys), dtype=bool)])
+            self._codes.update(zip(keys, range(code, code + len(keys))))
+            self._stale = True
+            return
+        code = len(self._keys) + len(self._pending)
+        for key, text in zip(keys, folded):
+            self._pending.append((key, text))
+            self._codes[key] = code
+            for gram in self._text_grams(text or ""):
+                self._extra.setdefault(gram, []).append(code)
+            code += 1
+        self._changes += len(keys)
+
+    def remove(self, keys):
+        """
+        Removes rows from the index, unknown keys are ignored
+
+        :param keys: row identifiers
+        :return: None
+        """
+        self._consolidate()
+        self._version += 1
+        for key in keys:
+            code = self._codes.pop(key, None)
+            if code is not None:
+                self._alive[code] = False
+                self._changes += 1
+        if self._changes > self.REBUILD_RATIO * len(self._codes):
+            self._rebuild()
+
+    def update(self, keys, texts):
+        """
+        Replaces the texts of the rows
+
+        :param keys: row identifiers
+        :param texts: new texts of the rows
+        :return: None
+        """
+        keys = list(keys)
+        self.remove(keys)
+        self.add(keys, texts)
+
+    def search(self, keyword: str) -> pd.Index:
+        """
+        Finds the rows whose text contains the keyword, case-insensitive.
+        When the keyword contains the keyword of the previous search and the index has not changed since,
+        only the previous matches are checked.
+
+        :param keyword: substring to look for
+        :return: keys of the matching rows, in the order they were added
+        """
+        self._consolidate()
+        if self._stale:
+            self._rebuild()
+        keyword = keyword.casefold()
+        if self._last is not None and self._last[2] == self._version and self._last[0] in keyword:
+            candidates = self._last[1]
+        elif len(keyword) < 3:
+            candidates = np.flatnonzero(self._alive)
+        else:
+            candidates = self._candidates(keyword)
+        found = np.fromiter((text is not None and keyword in text for text in self._texts[candidates]), dtype=bool,
+                            count=len(candidates))
+        candidates = candidates[found]
+        self._last = (keyword, candidates, self._version)
+        return pd.Index(self._keys[candidates], dtype=object)
+
+    def _candidates(self, keyword: str) -> np.ndarray:
+        """
+        Intersects the postings of the keyword trigrams
+
+        :param keyword: case-folded keyword, at least 3 characters long
+        :return: sorted codes of the live rows containing all trigrams of the keyword
+        """
+        postings = []
+        for gram in self._text_grams(keyword):
+            i = np.searchsorted(self._grams, gram)
+            found = i < len(self._grams) and self._grams[i] == gram
+            base = self._rows[self._starts[i]:self._starts[i + 1]] if found else self._empty
+            extra = self._extra.get(gram)
+            postings.append(np.concatenate([base, np.asarray(extra, dtype=np.int64)]) if extra else base)
+        postings.sort(key=len)
+        result = np.unique(postings[0])
+        for posting in postings[1:]:
+            if not len(result):
+                break
+            result = result[np.isin(result, posting)]
+        return result[self._alive[result]]
+
+    def _consolidate(self):
+        """
+        Moves the rows added one by one into the arrays
+
+        :return: None
+        """
+        if not self._pending:
+            return
+        keys, texts = zip(*self._pending)
+        self._keys = np.concatenate([self._keys, np.asarray(keys, dtype=object)])
+        self._texts = np.concatenate([self._texts, np.asarray(texts, dtype=object)])
+        self._alive = np.concatenate([self._alive, np.ones(len(keys), dtype=bool)])
+        self._pending = []
+
+    def _rebuild(self):
+        """
+        Drops the dead rows and builds the sorted postings table of all live rows
+
+        :return: None
+        """
+        self._consolidate()
+        live = np.flatnonzero(self._alive)
+        self._keys, self._texts = self._keys[live], self._texts[live]
+        self._alive = np.ones(len(live), dtype=bool)
+        self._codes = dict(zip(self._keys, range(len(live))))
+        grams, rows = self._gram_pairs(np.where(pd.isna(self._texts), "", self._texts))
+        order = np.argsort(grams)
+        grams = grams[order]
+        starts = np.flatnonzero(np.diff(grams)) + 1
+        self._grams = grams[np.concatenate([[0], starts])] if len(grams) else self._empty
+        self._starts = np.concatenate([[0], starts, [len(grams)]]).astype(np.int64)
+        self._rows = rows[order]
+        self._extra = {}
+        self._changes = 0
+        self._stale = False
+        self._version += 1
+
+    @classmethod
+    def _gram_pairs(cls, texts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized extraction of all (trigram, row) pairs.
+        A trigram is encoded as one int64 from the three code points (21 bits each).
+
+        :param texts: case-folded texts
+        :return: trigram codes and row codes
+        """
+        grams, rows = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        for start in range(0, len(texts), cls.CHUNK):
+            chunk = np.asarray(texts[start:start + cls.CHUNK], dtype=str)
+            if chunk.dtype.itemsize < 12:
+                continue
+            points = chunk.view(np.uint32).reshape(len(chunk), -1).astype(np.int64)
+            codes = (points[:, :-2] << 42) | (points[:, 1:-1] << 21) | points[:, 2:]
+            row, col = np.nonzero(points[:, 2:])
+            grams.append(codes[row, col])
+            rows.append(row + start)
+        return np.concatenate(grams), np.concatenate(rows)
+
+    @staticmethod
+    def _text_grams(text: str) -> set[int]:
+        """
+        Trigram codes of one text, encoded as in _gram_pairs()
+
+        :param text: case-folded text
+        :return: set of trigram codes
+        """
+        return {(ord(a) << 42) | (ord(b) << 21) | ord(c) for a, b, c in zip(text, text[1:], text[2:])}
+
+    @staticmethod
+    def fold(values: pd.Series) -> pd.Series:
+        """
+        Case folding of a text column for searches without the index, the same as the one of the index
+        ("ß" matches "SS", values which are not strings become missing)
+
+        :param values: text column
+        :return: case-folded column
+        """
+        return values.str.casefold()
+
+    @staticmethod
+    def _fold(texts) -> list[str]:
+        """
+        Case-folds the texts, values which are not strings never match and are kept as None
+
+        :param texts: texts to prepare
+        :return: list of case-folded texts
+        """
+        return [text.casefold() if isinstance(text, str) else None for text in texts]
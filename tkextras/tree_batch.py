@@ -0,0 +1,175 @@
+"""
+Contains the implementation of the class TreeBatch
+
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class TreeBatch:
+    """
+    Deferred DataFrame synchronization of TreeviewDataFrame.batch().
+
+    Inside a batch, set() and item(values=...) of the tree update the Tk cells at once and only record
+    the cell writes here. The recorded writes are applied to the dataframe of the tree column by column
+    in vectorized steps when the outermost batch ends, or earlier by apply(), which the tree calls first
+    in every operation reading or writing many rows. Every nested batch starts at a savepoint,
+    an exception leaving it discards the writes recorded after the savepoint and not applied yet.
+
+    """
+    def __init__(self, tree):
+        """
+        Initialization of the batch state
+
+        :param tree: TreeviewDataFrame
+        """
+        self.tree = tree
+        self.savepoints = []
+        self.ops = []
+        self.pending = {}
+        self.applied = []
+        self.check = False
+
+    @property
+    def active(self) -> bool:
+        """
+        A batch is open
+
+        :return: True inside tree.batch()
+        """
+        return bool(self.savepoints)
+
+    @contextmanager
+    def scope(self):
+        """
+        One batch, nested in the current one if there is one
+
+        :return: None
+        """
+        savepoint = len(self.ops)
+        self.savepoints.append(savepoint)
+        try:
+            yield
+        except BaseException:
+            self.rollback(savepoint)
+            raise
+        finally:
+            self.savepoints.pop()
+            if not self.savepoints:
+                self.finish()
+
+    def record(self, item: str | int, column: str, value: Any):
+        """
+        Records a cell write made inside a batch
+
+        :param item: iid
+        :param column: column name
+        :param value: new value, as shown in the Tk cell
+        :return: None
+        """
+        self.ops.append((item, column, self.value(item, column), value))
+        self.pending[(item, column)] = value
+
+    def value(self, item: str | int, column: str) -> Any:
+        """
+        Value of a cell as shown in the Tk cell, including the writes recorded by the batch
+
+        :param item: iid
+        :param column: column name
+        :return: value
+        """
+        return self.pending.get((item, column), self.tree._display_value(column, self.tree.df.at[item, column]))
+
+    def row_values(self, item: str | int) -> tuple:
+        """
+        Values of a row as shown in the Tk cells, including the writes recorded by the batch
+
+        :param item: iid
+        :return: tuple of values
+        """
+        values = self.tree._display_rows(self.tree.df.loc[[item]])[0]
+        if self.pending:
+            values = [self.pending.get((item, column), value) for column, value in zip(self.tree.df.columns, values)]
+        return tuple(values)
+
+    def written(self, iids: pd.Index, column: str, old: np.ndarray, new: np.ndarray):
+        """
+        Keeps the cells written to the dataframe inside a batch for last_changes
+
+        :param iids: rows
+        :param column: column name
+        :param old: previous values
+        :param new: new values
+        :return: None
+        """
+        if self.savepoints:
+            self.applied.append(pd.DataFrame(dict(zip(self.tree.CHANGES_COLUMNS, (iids, column, old, new)))))
+
+    def apply(self):
+        """
+        Applies the recorded cell writes to the dataframe of the tree
+
+        :return: None
+        """
+        if not self.pending:
+            return
+        columns = {}
+        for (item, column), value in self.pending.items():
+            columns.setdefault(column, ([], []))
+            columns[column][0].append(item)
+            columns[column][1].append(value)
+        self.ops, self.pending = [], {}
+        self.savepoints = [0] * len(self.savepoints)
+        for column, (items, values) in columns.items():
+            self.tree._write_column(self.tree.df.columns.get_loc(column), self.tree.df.index.get_indexer(items),
+                                    np.array(values, dtype=object))
+        self.check = True
+
+    def rollback(self, savepoint: int):
+        """
+        Discards the cell writes recorded after the savepoint and restores their Tk cells
+
+        :param savepoint: number of recorded writes to keep
+        :return: None
+        """
+        restore = {}
+        for item, column, before, _ in reversed(self.ops[savepoint:]):
+            restore[(item, column)] = before
+        del self.ops[savepoint:]
+        self.pending = {(item, column): value for item, column, _, value in self.ops}
+        columns = {}
+        for (item, column), value in restore.items():
+            if self.tree._is_rendered(item) and self.tree.exists(item):
+                columns.setdefault(column, ([], []))
+                columns[column][0].append(item)
+                columns[column][1].append(value)
+        for column, (items, values) in columns.items():
+            self.tree._tcl_bulk("set_cells", column, items, values)
+
+    def finish(self):
+        """
+        End of the outermost batch: applies the recorded writes, refreshes the "check all" state once
+        and generates <<TreeBatchApplied>>, last_changes of the tree then holds the changed cells
+
+        :return: None
+        """
+        self.savepoints.append(0)
+        try:
+            self.apply()
+        finally:
+            self.savepoints.pop()
+        applied, self.applied = [changes for changes in self.applied if len(changes)], []
+        checked, self.check = self.check, False
+        self.tree.last_changes = pd.concat(applied, ignore_index=True) if applied \
+            else pd.DataFrame(columns=self.tree.CHANGES_COLUMNS)
+        if checked:
+            self.tree.all_checked_update()
+        if len(self.tree.last_changes):
+            self.tree._event("<<TreeBatchApplied>>")
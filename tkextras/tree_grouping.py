@@ -0,0 +1,366 @@
+"""
+Contains the implementation of the class TreeGrouping
+
+"""
+from __future__ import annotations
+
+from tkinter import ttk
+from typing import Literal
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class TreeGrouping:
+    """
+    Grouping mode of TreeviewDataFrame.group_by(): the rows passing the filter are grouped by one or more
+    columns into parent nodes, one level per column.
+
+    Every level is one vectorized groupby, the rows of a node are one slice of the regrouped positions
+    and the checked counts of all nodes are sums over these slices, kept up to date as the cells change
+    (count()). The group nodes get their Tk items at once, the rows of a leaf group only when it is opened.
+    The mode is active while columns is not empty. The Tk items are handled with the methods of ttk.Treeview,
+    which the tree overrides.
+
+    """
+    def __init__(self, tree):
+        """
+        Initialization of the grouping, inactive
+
+        :param tree: TreeviewDataFrame
+        """
+        self.tree = tree
+        self.columns = []
+        self.open = set()
+        self.saved = None
+        self.reset()
+
+    @property
+    def active(self) -> bool:
+        """
+        The rows are grouped
+
+        :return: True if grouping columns are set
+        """
+        return bool(self.columns)
+
+    def group(self, columns: list):
+        """
+        Groups the rows by the columns, an empty list returns to the flat list of rows
+
+        :param columns: column names, the first one is the top level
+        :return: None
+        """
+        tree = self.tree
+        grouped = self.active
+        if columns and not grouped:
+            ttk.Treeview.delete(tree, *tree.df.index)
+            self.saved = (tree.cget("show"), ttk.Treeview.column(tree, "#0", "width"))
+            ttk.Treeview.configure(tree, show=("tree", "headings"))
+            ttk.Treeview.column(tree, "#0", width=20 * (len(columns) + 1), stretch=False)
+        self.columns = columns
+        self.open = set()
+        self.render()
+        if grouped and not columns:
+            ttk.Treeview.configure(tree, show=self.saved[0])
+            ttk.Treeview.column(tree, "#0", width=self.saved[1])
+            tree._tcl_bulk("insert", "", tree.df.index, tree._display_rows(tree.df))
+            tree.tk.call(tree._w, "children", "", tuple(tree.df.index[tree._display_positions(tree._filter_mask)]))
+
+    def rows_added(self, frame: pd.DataFrame, placed: bool = False):
+        """
+        Hook: rows appended to the data, the groups are rebuilt
+
+        :param frame: the new rows
+        :param placed: unused, the rows get their Tk items with their group
+        :return: None
+        """
+        self.render()
+
+    def rows_replaced(self, added: pd.DataFrame, removed: pd.DataFrame):
+        """
+        Hook: rows given new values in place, the checked counts of their groups follow
+
+        :param added: new state of the rows
+        :param removed: previous state of the rows, with the same index
+        :return: None
+        """
+        positions = self.tree.df.index.get_indexer(removed.index)
+        for index in range(1, len(self.tree.df.columns)):
+            self.count(positions, index, removed.iloc[:, index].to_numpy(), added.iloc[:, index].to_numpy())
+
+    def rows_removed(self, removed: pd.DataFrame):
+        """
+        Hook: rows deleted from the data, the groups are rebuilt
+
+        :param removed: the deleted rows
+        :return: None
+        """
+        self.render()
+
+    def cells_written(self, index: int, positions: np.ndarray, old: np.ndarray, values: np.ndarray):
+        """
+        Hook: cells written to one column, the checked counts of their groups follow
+
+        :param index: column number
+        :param positions: row positions in the data
+        :param old: previous values
+        :param values: new values
+        :return: None
+        """
+        if index:
+            self.count(positions, index, old, values)
+
+    def place(self, iid: str | int, index: int | Literal["end"]):
+        """
+        A row being inserted gets its place with the next rebuild of the groups
+
+        :param iid: iid of the row
+        :param index: unused
+        :return: None
+        """
+
+    def items(self) -> tuple:
+        """
+        Rows of all groups, in display order
+
+        :return: tuple of iids
+        """
+        return tuple(self.tree.df.index[self.positions])
+
+    def is_rendered(self, item: str | int) -> bool:
+        """
+        Checks whether the row is in an opened group
+
+        :param item: iid
+        :return: True if the row holds a Tk item
+        """
+        return item in self.shown
+
+    def rendered_mask(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Vectorized is_rendered() over rows of the data
+
+        :param positions: row positions in the data
+        :return: boolean array
+        """
+        return self.tree.df.index[positions].isin(list(self.shown))
+
+    def display_range(self, first: str | int, last: str | int) -> pd.Index | None:
+        """
+        Rows of the groups between two rows, both included
+
+        :param first: iid of one end
+        :param last: iid of the other end
+        :return: iids, None if one of the rows is not shown
+        """
+        return self.tree._position_range(self.positions, first, last)
+
+    def show(self, visible: pd.Index, offset: int | None = None):
+        """
+        The rows shown changed (filter, sort), the groups are rebuilt
+
+        :param visible: iids in display order
+        :param offset: unused
+        :return: None
+        """
+        self.render()
+
+    def rebuild(self):
+        """
+        The Tk items are recreated by the next render()
+
+        :return: None
+        """
+
+    def rows(self, item: str) -> pd.Index:
+        """
+        Rows of a group, in display order
+
+        :param item: iid of the group node
+        :return: iids
+        """
+        start, stop = self.ranges[self.nodes[item]]
+        return self.tree.df.index[self.positions[start:stop]]
+
+    def all_checked(self, item: str, index: int) -> bool:
+        """
+        Checks whether all rows of a group are checked in the column
+
+        :param item: iid of the group node
+        :param index: column number
+        :return: True if all rows are checked
+        """
+        node = self.nodes[item]
+        return self.checked[node, index] == self.size[node]
+
+    def reset(self):
+        """
+        Clears the group nodes
+
+        :return: None
+        """
+        self.nodes = {}
+        self.iids = []
+        self.keys = []
+        self.parent = np.empty(0, dtype=np.int64)
+        self.leaves = np.empty(0, dtype=bool)
+        self.ranges = np.empty((0, 2), dtype=np.int64)
+        self.size = np.empty(0, dtype=np.int64)
+        self.checked = np.empty((0, len(self.tree.df.columns)), dtype=np.int64)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.leaf = np.empty(0, dtype=np.int64)
+        self.shown = set()
+        self.filled = set()
+
+    def render(self):
+        """
+        Recreates the group nodes from the rows passing the filter, in the sort order.
+        Every level is one vectorized groupby, the rows of a node are one slice of the regrouped positions
+        and the checked counts of all nodes are sums over these slices (np.add.reduceat).
+        The groups opened before are opened again.
+
+        :return: None
+        """
+        tree = self.tree
+        tree._batch.apply()
+        top = [iid for iid, node in self.nodes.items() if self.parent[node] < 0]
+        if top:
+            ttk.Treeview.delete(tree, *top)
+        self.reset()
+        if not self.columns:
+            return
+        positions = tree._display_positions(tree._filter_mask)
+        if not len(positions):
+            return
+        keys = tree.df[self.columns].iloc[positions]
+        levels = []
+        for level in range(len(self.columns)):
+            by = self.columns[:level + 1]
+            try:
+                levels.append(keys.groupby(by, sort=True, dropna=False).ngroup().to_numpy())
+            except TypeError:
+                # keys of different types, groups in the order of appearance
+                levels.append(keys.groupby(by, sort=False, dropna=False).ngroup().to_numpy())
+        # stable: the rows of every node become contiguous and keep the display order
+        order = np.lexsort(levels[::-1])
+        positions, keys = positions[order], keys.iloc[order]
+        starts, node_of, parents, depths = [], [], [], []
+        count = 0
+        for level, codes in enumerate(levels):
+            codes = codes[order]
+            new = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.empty(0, dtype=bool)
+            first = np.flatnonzero(new)
+            starts.append(first)
+            parents.append(node_of[-1][first] if level else np.full(len(first), -1))
+            node_of.append(np.cumsum(new) - 1 + count)
+            depths.append(np.full(len(first), level))
+            count += len(first)
+        first = np.concatenate(starts)
+        self.parent = np.concatenate(parents).astype(np.int64)
+        self.leaves = np.concatenate(depths) == len(levels) - 1
+        stops = np.concatenate([np.r_[start[1:], len(positions)] for start in starts])
+        self.ranges = np.column_stack([first, stops]).astype(np.int64)
+        self.size = stops - first
+        self.checked = np.zeros((count, len(tree.df.columns)), dtype=np.int64)
+        for index in range(1, len(tree.df.columns)):
+            flags = tree._flags_to_bool(tree.df.iloc[positions, index]).astype(np.int64)
+            self.checked[:, index] = np.concatenate([np.add.reduceat(flags, start) for start in starts])
+        self.positions = positions
+        self.leaf = np.full(len(tree.df), -1, dtype=np.int64)
+        self.leaf[positions] = node_of[-1]
+        self.iids = [tree.GROUP_IID.format(node) for node in range(count)]
+        self.nodes = dict(zip(self.iids, range(count)))
+        self.keys = [tuple(keys.iloc[start, :depth + 1]) for start, depth in zip(first, np.concatenate(depths))]
+        labels = [f"{'' if pd.isna(key[-1]) else key[-1]} ({size})" for key, size in zip(self.keys, self.size)]
+        nodes = np.arange(count)
+        rows = list(zip(labels, *(self.symbols(nodes, index) for index in range(1, len(tree.df.columns)))))
+        parents = [self.iids[parent] if parent >= 0 else "" for parent in self.parent]
+        tree._tcl_bulk("insert_nodes", "group", parents, self.iids, rows)
+        leaves = [self.iids[node] for node in nodes[self.leaves]]
+        tree._tcl_bulk("insert_nodes", "placeholder", leaves, [f"{iid}.placeholder" for iid in leaves],
+                       [("",)] * len(leaves))
+        for node, key in enumerate(self.keys):
+            if key in self.open:
+                ttk.Treeview.item(tree, self.iids[node], open=True)
+                self.fill(node)
+
+    def fill(self, node: int):
+        """
+        Creates the Tk items of the rows of a leaf group, in place of its placeholder
+
+        :param node: group node
+        :return: None
+        """
+        if not self.leaves[node] or node in self.filled:
+            return
+        tree = self.tree
+        tree._batch.apply()
+        self.filled.add(node)
+        iid = self.iids[node]
+        ttk.Treeview.delete(tree, f"{iid}.placeholder")
+        start, stop = self.ranges[node]
+        rows = tree.df.iloc[self.positions[start:stop]]
+        tree._tcl_bulk("insert", iid, rows.index, tree._display_rows(rows))
+        self.shown.update(rows.index)
+
+    def opened(self, opened: bool):
+        """
+        Handles <<TreeviewOpen>> and <<TreeviewClose>>: remembers the open groups, fills a leaf group on opening
+
+        :param opened: the focused item was opened
+        :return: None
+        """
+        node = self.nodes.get(self.tree.focus())
+        if node is None:
+            return
+        if opened:
+            self.open.add(self.keys[node])
+            self.fill(node)
+        else:
+            self.open.discard(self.keys[node])
+
+    def count(self, positions: np.ndarray, index: int, old: np.ndarray, new: np.ndarray):
+        """
+        Updates the checked counts of the groups of changed cells and the flag cells of these groups
+
+        :param positions: row positions in the data
+        :param index: column number
+        :param old: previous values
+        :param new: new values
+        :return: None
+        """
+        tree = self.tree
+        positions = np.asarray(positions)
+        delta = tree._flags_to_bool(new).astype(np.int64) - tree._flags_to_bool(old).astype(np.int64)
+        nodes = np.full(len(positions), -1, dtype=np.int64)
+        known = positions < len(self.leaf)
+        nodes[known] = self.leaf[positions[known]]
+        keep = (nodes >= 0) & (delta != 0)
+        nodes, delta = nodes[keep], delta[keep]
+        touched = []
+        while len(nodes):
+            np.add.at(self.checked[:, index], nodes, delta)
+            touched.append(np.unique(nodes))
+            nodes = self.parent[nodes]
+            keep = nodes >= 0
+            nodes, delta = nodes[keep], delta[keep]
+        if touched:
+            touched = np.concatenate(touched)
+            tree._tcl_bulk("set_cells", tree.df.columns[index], [self.iids[node] for node in touched],
+                           self.symbols(touched, index))
+
+    def symbols(self, nodes: np.ndarray, index: int) -> list:
+        """
+        Flag marks of group nodes: "check" if all rows are checked, "uncheck" if none, "partial" otherwise
+
+        :param nodes: group nodes
+        :param index: column number
+        :return: list of symbols
+        """
+        checked, size = self.checked[nodes, index], self.size[nodes]
+        symbols = self.tree.svars["flag_symbol"]
+        return np.where(checked == size, symbols["check"],
+                        np.where(checked == 0, symbols["uncheck"], symbols["partial"])).tolist()
@@ -0,0 +1,200 @@
+"""
+Contains the implementation of the class TreeLoader
+
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from tkextras.lazy_import import lazy_import
+from tkextras.search_index import SearchIndex
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class TreeLoader:
+    """
+    Asynchronous loading of TreeviewDataFrame.load_stream(asynchronous=True).
+
+    A worker thread reads the chunks and prepares them (transform_df(), iids, counters). Every chunk is appended
+    to the dataframe of the tree as it arrives, in the flat list its Tk items are then created LOAD_CHUNK rows
+    at a time from the Tk event loop (step()), so the window keeps repainting; the virtual and grouping modes
+    show the rows at once. Every load has a generation, the chunks and steps of a cancelled load are dropped.
+
+    """
+    def __init__(self, tree):
+        """
+        Initialization of the loader
+
+        :param tree: TreeviewDataFrame
+        """
+        self.tree = tree
+        self.generation = 0
+        self.next = None
+        self.base = 0
+        self.open = False
+        self.progress = (0, 0)
+        self.error = None
+
+    def start(self, frames: Iterable[pd.DataFrame], first_column: str | None = None):
+        """
+        Starts a load in the background, cancelling a load still in progress
+
+        :param frames: iterable of dataframes, their columns are matched to the tree columns by position
+        :param first_column: prepare every chunk with transform_df() first, moving this column to the front
+        :return: None
+        """
+        tree = self.tree
+        self.cancel()
+        generation = self.generation
+        columns = list(tree.cget("columns"))
+        self.base = len(tree.df)
+        self.open = True
+        self.progress = (0, 0)
+        self.error = None
+
+        def prepare():
+            for i, frame in enumerate(frames):
+                if generation != self.generation:
+                    return
+                if first_column is not None:
+                    frame = tree.transform_df(frame.copy(deep=False), first_column, tree._flags)
+                frame = tree._align_frame(frame, columns, tree._new_iids(len(frame)))
+                index = SearchIndex(frame.index, frame.iloc[:, 0]) if tree.search_index is not None and not i else None
+                yield frame, tree._flag_counts(frame), index
+
+        tree._run_worker(prepare, lambda result: self.append(generation, *result),
+                         lambda: self.finish(generation), lambda error: self.failed(generation, error))
+
+    def append(self, generation: int, frame: pd.DataFrame, counts: np.ndarray, index: SearchIndex | None):
+        """
+        Appends a chunk prepared by the worker to the dataframe of the tree
+
+        :param generation: load the chunk belongs to, chunks of a cancelled load are dropped
+        :param frame: aligned rows
+        :param counts: flag counters of the rows
+        :param index: search index of the rows, used when the index of the tree is empty
+        :return: None
+        """
+        if generation != self.generation:
+            return
+        tree = self.tree
+        if frame.index.isin(tree.df.index).any():
+            # an iid taken by insert() while the worker ran
+            frame, counts, index = frame.set_axis(tree._new_iids(len(frame)), axis=0), None, None
+        start = len(tree.df)
+        stepped = tree._view is None
+        tree._append_frame(frame, counts, index, placed=stepped)
+        if not stepped:
+            self.progress = (len(tree.df) - self.base, len(tree.df) - self.base)
+            tree._event("<<TreeLoadProgress>>")
+        elif self.next is None:
+            self.next = start
+            self.step(generation)
+
+    def step(self, generation: int):
+        """
+        Creates the Tk items of the next LOAD_CHUNK rows and schedules the next step
+
+        :param generation: load the step belongs to
+        :return: None
+        """
+        if generation != self.generation or self.next is None:
+            return
+        tree = self.tree
+        tree._batch.apply()
+        start, stop = self.next, min(self.next + tree.LOAD_CHUNK, len(tree.df))
+        rows = tree.df.iloc[start:stop]
+        tree._tcl_bulk("insert", "", rows.index, tree._display_rows(rows))
+        self.next = stop
+        if stop < len(tree.df) or self.open:
+            self.progress = (stop - self.base, len(tree.df) - self.base)
+            tree._event("<<TreeLoadProgress>>")
+        if stop < len(tree.df):
+            tree.after_idle(self.step, generation)
+        else:
+            self.next = None
+            if not self.open:
+                self.done()
+
+    def flush(self):
+        """
+        Creates at once the Tk items the steps have not created yet
+
+        :return: None
+        """
+        if self.next is None:
+            return
+        rows = self.tree.df.iloc[self.next:]
+        self.tree._tcl_bulk("insert", "", rows.index, self.tree._display_rows(rows))
+        self.next = None
+        if not self.open:
+            self.done()
+
+    def rendered(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Rows of the flat list holding their Tk items: the rows past the next step have none yet
+
+        :param positions: row positions in the dataframe of the tree
+        :return: boolean array
+        """
+        if self.next is None:
+            return np.ones(len(positions), dtype=bool)
+        return np.asarray(positions) < self.next
+
+    def finish(self, generation: int):
+        """
+        The worker has read all chunks
+
+        :param generation: load the worker belongs to
+        :return: None
+        """
+        if generation != self.generation:
+            return
+        self.open = False
+        if self.next is None:
+            self.done()
+
+    def failed(self, generation: int, error: BaseException):
+        """
+        The worker failed: the load is closed with the rows received so far and error set
+
+        :param generation: load the worker belongs to
+        :param error: exception raised by the worker
+        :return: None
+        """
+        if generation != self.generation:
+            return
+        self.generation += 1
+        self.open = False
+        self.error = error
+        if self.next is None:
+            self.done()
+        else:
+            self.flush()
+
+    def done(self):
+        """
+        End of a load, reports the complete progress
+
+        :return: None
+        """
+        loaded = len(self.tree.df) - self.base
+        self.progress = (loaded, loaded)
+        self.tree._event("<<TreeLoadProgress>>")
+        self.tree._event("<<TreeLoadDone>>")
+
+    def cancel(self):
+        """
+        Cancels a load in progress: chunks not appended yet are dropped,
+        as well as rows whose Tk items are not created yet.
+
+        :return: None
+        """
+        self.generation += 1
+        self.open = False
+        if self.next is None:
+            return
+        self.tree._rows_removed(np.arange(self.next, len(self.tree.df)))
+        self.next = None
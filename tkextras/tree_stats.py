@@ -0,0 +1,215 @@
+"""
+Contains the implementation of the class TreeStats
+
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable
+
+from tkextras.lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class TreeStats:
+    """
+    Opt-in instrumentation of a TreeviewDataFrame: counts and times the Tcl calls, the DataFrame synchronization,
+    the filter and sort computations and the virtual events, per operation and per user action.
+
+    While attached, the methods listed in OPERATIONS are wrapped on the instances (the tree, or a collaborator
+    of the tree for a dotted name such as "_batch.apply") and the Tcl interpreter of the tree is seen through
+    a counting proxy. Detaching removes both, so a tree without stats runs
+    the plain methods and costs nothing.
+
+    A user action is an outermost instrumented call (a click, "check all", a filter...). When it ends,
+    its record is appended to actions, passed to the callback and logged at DEBUG level to the logger.
+
+    """
+    OPERATIONS = (
+        "make_tree", "bulk_insert", "insert", "item", "set", "delete", "set_column", "rebuild_tree",
+        "toggle_cell", "mark_selected", "mark_all", "sort_click", "sort_by", "filter_by_name", "filter_by",
+        "apply_filter", "all_checked_update", "group_by", "group_toggle", "_write_column", "_rows_appended",
+        "_rows_replaced", "_rows_removed", "_cell_written", "_batch.apply", "_append_frame", "_display_positions",
+        "_grouping.render", "_model_sync.receive_cells", "_model_sync.receive_rows", "_event_flush", "_virtual.render",
+    )
+
+    def __init__(self, callback: Callable[[dict], Any] | None = None, logger=None, history: int = 100):
+        """
+        Initialization of the stats
+
+        :param callback: function receiving the record of every finished user action
+        :param logger: logging.Logger receiving the records at DEBUG level
+        :param history: number of user actions kept in actions
+        """
+        self.callback = callback
+        self.logger = logger
+        self.operations = {}
+        self.tcl = {}
+        self.events = {}
+        self.actions = deque(maxlen=history)
+        self._stack = []
+        self._tree = None
+        self._tk = None
+
+    def attach(self, tree):
+        """
+        Starts instrumenting the tree
+
+        :param tree: TreeviewDataFrame
+        :return: None
+        """
+        self._tree, self._tk = tree, tree.tk
+        tree.tk = _TclProxy(tree.tk, tree._w, self)
+        for name in self.OPERATIONS:
+            owner, attribute = self._owner(tree, name)
+            if owner is not None:
+                setattr(owner, attribute, self._wrap(name, getattr(owner, attribute)))
+
+    def detach(self):
+        """
+        Stops instrumenting the tree, the collected data is kept
+
+        :return: None
+        """
+        if self._tree is None:
+            return
+        for name in self.OPERATIONS:
+            owner, attribute = self._owner(self._tree, name)
+            if owner is not None:
+                owner.__dict__.pop(attribute, None)
+        self._tree.tk = self._tk
+        self._tree = self._tk = None
+
+    def reset(self):
+        """
+        Clears the collected data
+
+        :return: None
+        """
+        self.operations.clear()
+        self.tcl.clear()
+        self.events.clear()
+        self.actions.clear()
+
+    def report(self) -> pd.DataFrame:
+        """
+        The collected data as a table: one row per operation, Tcl command and virtual event
+
+        :return: dataframe with the columns kind, name, calls, time, tcl_calls, tcl_time (times in seconds)
+        """
+        rows = [dict(kind="operation", name=name, **values) for name, values in self.operations.items()]
+        rows += [dict(kind="tcl", name=name, **values) for name, values in self.tcl.items()]
+        rows += [dict(kind="event", name=name, calls=calls) for name, calls in self.events.items()]
+        columns = ["kind", "name", "calls", "time", "tcl_calls", "tcl_time"]
+        return pd.DataFrame(rows, columns=columns).fillna(0)
+
+    @staticmethod
+    def _owner(tree, name: str) -> tuple[Any, str]:
+        """
+        Object holding an instrumented method
+
+        :param tree: TreeviewDataFrame
+        :param name: operation name, a method of the tree or, dotted, of one of its collaborators
+        :return: the object (None for a collaborator the tree does not use) and the method name
+        """
+        *path, attribute = name.split(".")
+        owner = tree
+        for part in path:
+            owner = getattr(owner, part, None)
+        return owner, attribute
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        """
+        Wraps a bound method with the timing of the operation
+
+        :param name: operation name
+        :param method: bound method
+        :return: wrapper
+        """
+        def wrapper(*args, **kwargs):
+            self._stack.append([name, time.perf_counter(), 0, 0.0, {}])
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._finish()
+
+        return wrapper
+
+    def _finish(self):
+        """
+        Records the operation on top of the stack, the outermost one as a user action
+
+        :return: None
+        """
+        name, start, tcl_calls, tcl_time, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        values = self.operations.setdefault(name, dict(calls=0, time=0.0, tcl_calls=0, tcl_time=0.0))
+        values["calls"] += 1
+        values["time"] += elapsed
+        values["tcl_calls"] += tcl_calls
+        values["tcl_time"] += tcl_time
+        if self._stack:
+            parent = self._stack[-1]
+            parent[2] += tcl_calls
+            parent[3] += tcl_time
+            parent[4][name] = parent[4].get(name, 0) + 1
+            for key, count in nested.items():
+                parent[4][key] = parent[4].get(key, 0) + count
+            return
+        action = dict(action=name, time=elapsed, tcl_calls=tcl_calls, tcl_time=tcl_time, operations=nested)
+        self.actions.append(action)
+        if self.callback is not None:
+            self.callback(action)
+        if self.logger is not None:
+            self.logger.debug("%s: %.6f s, %d Tcl calls (%.6f s), %s", name, elapsed, tcl_calls, tcl_time, nested)
+
+    def _tcl_call(self, command: str, event: str | None, elapsed: float):
+        """
+        Records a Tcl call
+
+        :param command: widget subcommand or Tcl command
+        :param event: virtual event name for "event generate"
+        :param elapsed: duration
+        :return: None
+        """
+        values = self.tcl.setdefault(command, dict(calls=0, time=0.0))
+        values["calls"] += 1
+        values["time"] += elapsed
+        if event is not None:
+            self.events[event] = self.events.get(event, 0) + 1
+        if self._stack:
+            self._stack[-1][2] += 1
+            self._stack[-1][3] += elapsed
+
+
+class _TclProxy:
+    """
+    Tcl interpreter of an instrumented tree: times call() and passes everything else through
+
+    """
+    def __init__(self, tk, widget: str, stats: TreeStats):
+        self._tk = tk
+        self._widget = widget
+        self._stats = stats
+
+    def __getattr__(self, name: str):
+        return getattr(self._tk, name)
+
+    def call(self, *args):
+        start = time.perf_counter()
+        try:
+            return self._tk.call(*args)
+        finally:
+            if len(args) == 1 and isinstance(args[0], tuple):
+                args = args[0]
+            command = str(args[0]) if args else ""
+            event = None
+            if command == self._widget and len(args) > 1:
+                command = str(args[1])
+            elif command.startswith("::tkextras::"):
+                command = command[len("::"):].replace("::", ".")
+            elif command == "event" and len(args) > 3:
+                command, event = "event generate", str(args[3])
+            self._stats._tcl_call(command, event, time.perf_counter() - start)
@@ -2,12 +2,58 @@
 Contains the implementation of the class TreeviewDataFrame.
 
 """
+from __future__ import annotations
+
+import copy
+import itertools
+import os
+import queue
+import re
+import threading
 import tkinter as tk
+from contextlib import contextmanager
 from tkinter import ttk
-from typing import Any, Literal
+from typing import Any, Callable, Iterable, Iterator, Literal
 
-import pandas as pd
 from tkextras import WidgetsRender
+from tkextras.change_journal import ChangeJournal
+from tkextras.dataframe_model import DataFrameModel
+from tkextras.filter_expression import FilterExpression
+from tkextras.lazy_import import lazy_import
+from tkextras.model_sync import ModelSync
+from tkextras.search_index import SearchIndex
+from tkextras.tree_batch import TreeBatch
+from tkextras.tree_grouping import TreeGrouping
+from tkextras.tree_loader import TreeLoader
+from tkextras.tree_stats import TreeStats
+from tkextras.virtual_window import VirtualWindow
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+_TCL_PROCS = """
+namespace eval ::tkextras {}
+proc ::tkextras::insert {w parent ids rows} {
+    foreach id $ids row $rows {
+        $w insert $parent end -id $id -values $row
+    }
+}
+proc ::tkextras::insert_nodes {w tags parents ids rows} {
+    foreach parent $parents id $ids row $rows {
+        $w insert $parent end -id $id -values $row -tags $tags
+    }
+}
+proc ::tkextras::set_cells {w column ids values} {
+    foreach id $ids value $values {
+        $w set $id $column $value
+    }
+}
+proc ::tkextras::set_items {w option ids values} {
+    foreach id $ids value $values {
+        $w item $id $option $value
+    }
+}
+"""
 
 
 class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
@@ -20,7 +66,8 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
     _svars = {
         "flag_symbol": {
             "check": "✔",
-            "uncheck": " "
+            "uncheck": " ",
+            "partial": "■"
         },
         "check_all": {}
     }
@@ -28,37 +75,154 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         _svars["flag_symbol"]["uncheck"]: _svars["flag_symbol"]["check"],
         _svars["flag_symbol"]["check"]: _svars["flag_symbol"]["uncheck"]
     }
+    BULK_CHUNK = 10000
+    LOAD_CHUNK = 2000
+    WORKER_POLL = 20
+    VIRTUAL_BUFFER = 20
+    FILTER_CACHE = 64
+    GROUP_IID = "::group::{}"
+    REGEX_CHARS = frozenset(".^$*+?{}[]\\|()")
+    CHANGES_COLUMNS = ["iid", "column", "old", "new"]
 
     def __init__(self, parent: tk.Widget | tk.Tk, dataframe: pd.DataFrame = None, render_params: dict = None,
-                 *args, **kwargs):
+                 *args, virtual: bool = False, search_index: bool = False,
+                 flags: Literal["symbol", "bool"] = "symbol", asynchronous: bool = False,
+                 model: DataFrameModel | None = None, events: Literal["immediate", "idle"] = "immediate", **kwargs):
         """
 
         :param parent:
         :param dataframe:
         :param render_params:
         :param args:
+        :param virtual: only the rows around the viewport exist as Tk items, self.df keeps all the data
+        :param search_index: maintain a SearchIndex over the first column to speed up filter_by_name
+        :param flags: storage of the flag columns in self.df: "symbol" - the display symbols,
+            "bool" - NumPy booleans, converted to symbols only for the Tk cells; a view uses the storage of its model
+        :param asynchronous: load the dataframe in the background, see load_stream()
+        :param model: show the data of a DataFrameModel shared with other views, the columns option then selects
+            the model columns shown by this view
+        :param events: "immediate" - the virtual events of the tree are generated on every change,
+            "idle" - they are collected and generated once per idle cycle with a payload, see event_changes()
         :param kwargs:
         """
+        self._svars = copy.deepcopy(self._svars)
+        self.model = model
+        if model is not None:
+            flags = model.flags
+            shown = list(kwargs.get("columns", model.columns))
+            missing = [col for col in shown if col not in model.columns]
+            if missing:
+                raise KeyError(f"Columns {missing} not found in the model.")
+            kwargs.update(columns=model.columns, displaycolumns=shown)
+        self._virtual = None
+        self._flags = flags
+        yscrollcommand = kwargs.pop("yscrollcommand", None) if virtual else None
         super().__init__(render_params, parent, *args, **kwargs)
         self.df = pd.DataFrame(columns=self.cget("columns"))
-        self.filtered_df = self.df.copy()
-        self.bind("<Button-1>", self.toggle_cell)
+        if flags == "bool":
+            self.df = self.df.astype(dict.fromkeys(self.df.columns[1:], bool))
+        self._iid_serial = 0
+        self._iid_lock = threading.Lock()
+        self._virtual = VirtualWindow(self, yscrollcommand) if virtual else None
+        self._filter_mask = None
+        self._filtered = None
+        self._counts = np.zeros((2, len(self.df.columns)), dtype=np.int64)
+        self._filter_counts = None
+        self._filter_rows = 0
+        self._filter_cache = {}
+        self.search_index = SearchIndex() if search_index else None
+        self._batch = TreeBatch(self)
+        self.last_changes = pd.DataFrame(columns=self.CHANGES_COLUMNS)
+        self.last_toggled = pd.Index([], dtype=object)
+        self._anchor = None
+        self._mark_column = None
+        self._journal = ChangeJournal(self, collect=events == "idle")
+        self._events = events
+        self._event_pending = {}
+        self._event_after = None
+        self._event_net = None
+        self.event_payload = dict(events=[], filter_rows=0)
+        self._loader = TreeLoader(self)
+        self._sort_keys = []
+        self._sort_cache = {}
+        self._sort_order = None
+        self._grouping = TreeGrouping(self)
+        # collaborators receiving every change of self.df, see _rows_appended() and _cells_written();
+        # the display mode (_view) receives them after these
+        self._parts = [self._journal]
+        self._model_sync = None
+        self.stats = None
+        if model is not None:
+            self._model_sync = ModelSync(self, model)
+            model.attach(self)
+            self.df = model.df
+            if len(self.df):
+                self._rows_appended(self.df)
+            # the rows already in the model are not passed back to it
+            self._parts.append(self._model_sync)
+        # handlers are looked up on every event, so instrumented methods (enable_stats) are used
+        self.bind("<Button-1>", lambda event: self.toggle_cell(event))
+        self.bind("<Button-1>", lambda event: self.sort_click(event), add="+")
+        self.bind("<Shift-Button-1>", lambda event: self.toggle_cell(event, extend=True))
+        self.bind("<Shift-Button-1>", lambda event: self.sort_click(event, extend=True), add="+")
+        self.bind("<<TreeviewOpen>>", lambda event: self._grouping.opened(True))
+        self.bind("<<TreeviewClose>>", lambda event: self._grouping.opened(False))
+        self.bind("<space>", lambda event: self._mark_key(self.mark_selected))
+        for key in ("<Control-a>", "<Control-A>"):
+            self.bind(key, lambda event: self._mark_key(self.mark_all))
         if not (dataframe is None):
-            self.make_tree(dataframe)
+            self.make_tree(dataframe, asynchronous=asynchronous)
+
+    def enable_stats(self, callback: Callable[[dict], Any] | None = None, logger=None) -> TreeStats:
+        """
+        Turns on the instrumentation of the tree (see TreeStats), stats then holds the collected data.
+        Without it the tree runs uninstrumented.
+
+        :param callback: function receiving the record of every finished user action
+        :param logger: logging.Logger receiving the records at DEBUG level
+        :return: the stats
+        """
+        self.disable_stats()
+        self.stats = TreeStats(callback, logger)
+        self.stats.attach(self)
+        return self.stats
+
+    def disable_stats(self):
+        """
+        Turns off the instrumentation, the last stats object keeps the collected data
+
+        :return: None
+        """
+        if self.stats is not None:
+            self.stats.detach()
+            self.stats = None
 
-    def make_tree(self, df: pd.DataFrame = None):
+    def make_tree(self, df: pd.DataFrame = None, asynchronous: bool = False, first_column: str | None = None):
         """
-        Builds the tree according to the dataframe
+        Builds the tree according to the dataframe.
+        An asynchronous build returns at once and runs as load_stream([df], asynchronous=True).
+        A new make_tree() call cancels a build still in progress.
 
         :param df: the dataframe for building
+        :param asynchronous: build in the background
+        :param first_column: prepare the dataframe with transform_df() first, moving this column to the front
         :return: None
         """
+        self.cancel_load()
         if not (df is None):
             cols = df.columns.to_list()
+            if first_column in cols:
+                cols.remove(first_column)
+                cols.insert(0, first_column)
             if len(self.df):
-                self.delete(*self.get_children(), inplace=True)
-            for index, row in df.iterrows():
-                self.insert("", "end", values=tuple(row))
+                self.delete(*self.df.index)
+                self.reset_filter()
+            self._sort_cache.clear()
+            if self._sort_keys:
+                # the new rows are shown in the order of the dataframe
+                self._sort_keys, self._sort_order = [], None
+                self.sort_event_evoke()
+            self.load_stream([df], first_column, asynchronous)
         else:
             cols = self.df.columns.to_list()
         col_index = 0
@@ -69,15 +233,557 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
                 col_index = 1
             else:
                 self.column(col, width=100, anchor="center")
+        self._sort_headings()
+
+    @classmethod
+    def from_source(cls, parent: tk.Widget | tk.Tk, path: str | os.PathLike, first_column: str | None = None,
+                    chunksize: int = 100000, render_params: dict = None, read_options: dict = None,
+                    asynchronous: bool = False, **kwargs) -> "TreeviewDataFrame":
+        """
+        Creates a tree over a CSV, Parquet or Arrow file, loading it chunk by chunk (see read_source()).
+        The columns of the tree are taken from the first chunk, which is read at once.
+
+        :param parent: parent widget
+        :param path: path of the file
+        :param first_column: column moved to the front by transform_df(), None to load the chunks as they are
+        :param chunksize: number of rows in a chunk
+        :param render_params: render parameters of the tree
+        :param read_options: additional options of the reader (e.g. sep for pandas.read_csv)
+        :param asynchronous: read the rest of the file in the background, see load_stream()
+        :param kwargs: other arguments of the tree (flags, virtual, search_index, ttk.Treeview options)
+        :return: the tree
+        """
+        chunks = cls.read_source(path, chunksize, **(read_options or {}))
+        first = next(chunks, pd.DataFrame())
+        cols = first.columns.to_list()
+        if first_column in cols:
+            cols.remove(first_column)
+            cols.insert(0, first_column)
+        tree = cls(parent, render_params=render_params, columns=cols, **kwargs)
+        tree.make_tree()
+        tree.load_stream(itertools.chain([first], chunks), first_column, asynchronous)
+        return tree
+
+    @staticmethod
+    def read_source(path: str | os.PathLike, chunksize: int = 100000, **options) -> Iterator[pd.DataFrame]:
+        """
+        Reads a file chunk by chunk: CSV with the chunked reader of pandas,
+        Parquet (.parquet, .pq) by record batches and Arrow IPC files (.arrow, .feather, .ipc; .arrows for
+        the stream format) memory-mapped. Parquet and Arrow files require pyarrow.
+        Parquet options selecting columns and rows (columns, row_groups, use_threads, use_pandas_metadata)
+        go to ParquetFile.iter_batches(), filters (as in pyarrow.parquet.read_table(), on the read columns)
+        are applied to every batch, the other options go to ParquetFile.
+
+        :param path: path of the file
+        :param chunksize: number of rows in a chunk
+        :param options: additional options of the reader
+        :return: iterator of dataframes
+        """
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix not in (".parquet", ".pq", ".arrow", ".feather", ".ipc", ".arrows"):
+            with pd.read_csv(path, chunksize=chunksize, **options) as reader:
+                yield from reader
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.compute  # noqa
+            import pyarrow.ipc  # noqa
+            import pyarrow.parquet  # noqa
+        except ImportError as error:
+            raise ImportError("Reading Parquet and Arrow files requires pyarrow: pip install tkextras[arrow]") \
+                from error
+        if suffix in (".parquet", ".pq"):
+            selection = {name: options.pop(name) for name in ("columns", "row_groups", "use_threads",
+                                                              "use_pandas_metadata") if name in options}
+            filters = options.pop("filters", None)
+            if filters is not None and not isinstance(filters, pa.compute.Expression):
+                filters = pa.parquet.filters_to_expression(filters)
+            parquet = pa.parquet.ParquetFile(path, **{"memory_map": True, **options})
+            for batch in parquet.iter_batches(batch_size=chunksize, **selection):
+                if filters is not None:
+                    batch = pa.Table.from_batches([batch]).filter(filters)
+                if batch.num_rows:
+                    yield batch.to_pandas()
+            return
+        with pa.memory_map(os.fspath(path)) as source:
+            reader = pa.ipc.open_stream(source, **options) if suffix == ".arrows" else \
+                pa.ipc.open_file(source, **options)
+            batches = reader if suffix == ".arrows" else (reader.get_batch(i) for i in range(reader.num_record_batches))
+            for batch in batches:
+                for start in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(start, chunksize).to_pandas()
+
+    def load_stream(self, frames: Iterable[pd.DataFrame], first_column: str | None = None,
+                    asynchronous: bool = False):
+        """
+        Appends the rows of the dataframes to the tree, chunk by chunk, as they come: the source is never
+        held in memory as a whole. Each chunk is appended to self.df with one concat, which copies the column
+        arrays of self.df (the values of object and string columns are shared, not copied), so memory peaks
+        at self.df plus a copy of its column arrays plus one chunk.
+
+        An asynchronous load returns at once: the chunks are read and prepared in a worker thread
+        (transform_df(), iids, counters), each chunk is appended to self.df as it arrives
+        and the Tk items are created LOAD_CHUNK rows at a time from the Tk event loop, so the window keeps
+        repainting. Each step generates <<TreeLoadProgress>> (load_progress holds the numbers of loaded rows
+        and of rows received so far), the end of the load <<TreeLoadDone>>. If reading or preparing a chunk fails,
+        the rows received so far stay, the load ends with <<TreeLoadDone>> and load_error holding the exception,
+        which is then reported by Tk (report_callback_exception()).
+        Rows are readable and writable while their Tk items are created; delete(), filtering and other
+        operations on many rows first create the items of the rows received so far.
+        A new asynchronous load or make_tree() cancels a load still in progress.
+
+        :param frames: iterable of dataframes, their columns are matched to the tree columns by position
+        :param first_column: prepare every chunk with transform_df() first, moving this column to the front
+        :param asynchronous: load in the background
+        :return: None
+        """
+        if not asynchronous:
+            for frame in frames:
+                if first_column is not None:
+                    frame = self.transform_df(frame.copy(deep=False), first_column, self._flags)
+                self.bulk_insert(frame)
+            return
+        self._loader.start(frames, first_column)
+
+    def bulk_insert(self, df: pd.DataFrame) -> pd.Index:
+        """
+        Appends all rows of the dataframe to the tree root and to self.df in one step.
+        The columns of df are matched to the tree columns by position, as in insert().
+
+        :param df: the dataframe being loaded
+        :return: the iids generated for the new rows
+        """
+        iids = self._new_iids(len(df))
+        self._append_frame(self._align_frame(df, list(self.cget("columns")), iids))
+        return iids
+
+    def _align_frame(self, df: pd.DataFrame, columns: list, iids: pd.Index) -> pd.DataFrame:
+        """
+        Brings a loaded dataframe to the shape of self.df: the iids as index, the columns matched by position,
+        the flag columns in the storage form. Does not touch Tk, so it can run in a worker thread.
+
+        :param df: the dataframe being loaded
+        :param columns: the tree columns
+        :param iids: the iids of the rows
+        :return: aligned dataframe
+        """
+        frame = df.iloc[:, :len(columns)]
+        frame = frame.set_axis(iids, axis=0).set_axis(columns[:frame.shape[1]], axis=1)
+        return self._store_frame(frame.reindex(columns=columns, fill_value=""))
+
+    def cancel_load(self):
+        """
+        Cancels an asynchronous load in progress: chunks not appended yet are dropped,
+        as well as rows whose Tk items are not created yet.
+
+        :return: None
+        """
+        self._loader.cancel()
+
+    @property
+    def load_progress(self) -> tuple[int, int]:
+        """
+        Progress of the last asynchronous load
+
+        :return: numbers of rows loaded and of rows received so far
+        """
+        return self._loader.progress
+
+    @property
+    def load_error(self) -> BaseException | None:
+        """
+        Exception that ended the last asynchronous load
+
+        :return: the exception, None if the load did not fail
+        """
+        return self._loader.error
+
+    def _run_worker(self, job: Callable[[], Any], callback: Callable[[Any], None],
+                    finish: Callable[[], None] | None = None, failed: Callable[[BaseException], None] | None = None):
+        """
+        Runs job() in a daemon thread and passes its result to callback() in the Tk event loop.
+        If job() is a generator, callback() receives its items one by one and finish() is called after the last one;
+        the worker prepares at most one item ahead.
+        The thread never touches Tk: the main thread polls for the results every WORKER_POLL ms.
+        An exception raised by job() is passed to failed() and then raised again in the event loop,
+        where Tk reports it.
+
+        :param job: function without arguments
+        :param callback: function receiving the result
+        :param finish: function called when a generator is exhausted
+        :param failed: function receiving the exception raised by job()
+        :return: None
+        """
+        results = queue.Queue(maxsize=1)
+        end = object()
+
+        def work():
+            try:
+                result = job()
+                for item in result if isinstance(result, Iterator) else [result]:
+                    results.put((True, item))
+                results.put((True, end))
+            except BaseException as error:  # noqa
+                results.put((False, error))
+
+        def poll():
+            try:
+                done, result = results.get_nowait()
+            except queue.Empty:
+                self.after(self.WORKER_POLL, poll)
+                return
+            if not done:
+                if failed is not None:
+                    failed(result)
+                raise result
+            if result is end:
+                if finish is not None:
+                    finish()
+                return
+            callback(result)
+            self.after_idle(poll)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(self.WORKER_POLL, poll)
+
+    def _append_frame(self, frame: pd.DataFrame, counts: np.ndarray | None = None, index: SearchIndex | None = None,
+                      placed: bool = False):
+        """
+        Appends rows with new iids (the frame index) and the columns of self.df to self.df and to the tree root.
+        The flag columns of the frame are already in the storage form (see _store_frame()).
+
+        :param frame: rows to append
+        :param counts: flag counters of the rows, if already known
+        :param index: search index of the rows, taken over when the index of the tree is empty
+        :param placed: the Tk items of the rows are created by the steps of an asynchronous load (TreeLoader)
+        :return: None
+        """
+        if not placed:
+            self._loader.flush()
+        self._batch.apply()
+        self.df = frame if not len(self.df) else pd.concat([self.df, frame])
+        self._rows_appended(frame, counts, index, placed)
+
+    def _rows_appended(self, frame: pd.DataFrame, counts: np.ndarray | None = None, index: SearchIndex | None = None,
+                       placed: bool = False):
+        """
+        Hook for rows just appended to self.df: brings the counters, the caches, the filter mask
+        and the search index up to date, passes the rows to the collaborators (self._parts) and shows them
+
+        :param frame: the appended rows, the last ones of self.df
+        :param counts: flag counters of the rows, if already known
+        :param index: search index of the rows, taken over when the index of the tree is empty
+        :param placed: the rows already have their place in the tree (insert()),
+            or their Tk items are created by the steps of an asynchronous load
+        :return: None
+        """
+        self._cache_invalidate()
+        counts = self._flag_counts(frame) if counts is None else counts
+        self._counts += counts
+        if self._filter_mask is not None:
+            self._filter_mask = np.concatenate([self._filter_mask, np.ones(len(frame), dtype=bool)])
+            self._filter_counts += counts
+            self._filter_rows += len(frame)
+        if self.search_index is not None:
+            if index is not None and not len(self.search_index):
+                self.search_index = index
+            else:
+                self.search_index.add(frame.index, frame.iloc[:, 0])
+        for part in self._parts:
+            part.rows_added(frame)
+        view = self._view
+        if view is not None:
+            view.rows_added(frame, placed)
+        elif not placed:
+            self._tcl_bulk("insert", "", frame.index, self._display_rows(frame))
+
+    def _new_iids(self, count: int) -> pd.Index:
+        """
+        Generates item identifiers in the Treeview format ("I001", "I002", ...) that are not used yet.
+        Safe to call from a worker thread.
+
+        :param count: number of identifiers
+        :return: index of new identifiers
+        """
+        iids = pd.Index([], dtype=object)
+        # the views of a model share its serial
+        owner = self if self.model is None else self.model
+        while len(iids) < count:
+            with owner._iid_lock:
+                serial = owner._iid_serial
+                owner._iid_serial += count - len(iids)
+                stop = owner._iid_serial
+            candidates = pd.Index([f"I{n:03X}" for n in range(serial + 1, stop + 1)], dtype=object)
+            iids = iids.append(candidates[~candidates.isin(self.df.index)])
+        return iids
+
+    def _tcl_bulk(self, command: str, *args):
+        """
+        Runs one of the batch Tcl procedures (see _TCL_PROCS) over lists of items,
+        in chunks of BULK_CHUNK items, so there is one Python-Tcl round trip per chunk instead of per item.
+
+        :param command: procedure name
+        :param args: a scalar first argument (e.g. parent or column), followed by lists of equal length
+        :return: None
+        """
+        if not self.tk.call("info", "procs", "::tkextras::insert"):
+            self.tk.eval(_TCL_PROCS)
+        first, lists = args[0], args[1:]
+        for start in range(0, len(lists[0]), self.BULK_CHUNK):
+            chunk = tuple(tuple(lst[start:start + self.BULK_CHUNK]) for lst in lists)
+            self.tk.call(f"::tkextras::{command}", self._w, first, *chunk)
+
+    @property
+    def _view(self) -> VirtualWindow | TreeGrouping | None:
+        """
+        Display mode showing the rows instead of the flat list of Tk items: the virtual window,
+        or the grouping while the rows are grouped
+
+        :return: the mode, None for the flat list
+        """
+        return self._virtual or (self._grouping if self._grouping.active else None)
+
+    def visible_items(self) -> tuple:
+        """
+        Returns the iids of all rows shown by the tree, in display order.
+        Unlike get_children(), in virtual mode it includes rows that currently have no Tk item,
+        in grouping mode it lists the rows of all groups (without the group nodes).
+
+        :return: tuple of iids
+        """
+        if self._view is not None:
+            return self._view.items()
+        return self.get_children()
+
+    def _is_rendered(self, item: str | int) -> bool:
+        """
+        Checks whether the row has a Tk item (outside the virtual and grouping modes always, except rows
+        of an asynchronous build still waiting for their items)
+
+        :param item: iid
+        :return: True if the Treeview holds the item
+        """
+        if self._view is not None:
+            return self._view.is_rendered(item)
+        return self._loader.next is None or self._loader.rendered(self.df.index.get_indexer([item]))[0]
+
+    def _rendered_mask(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _is_rendered() over rows of self.df
+
+        :param positions: row positions in self.df
+        :return: boolean array, True for the rows holding a Tk item
+        """
+        positions = np.asarray(positions)
+        if self._view is not None:
+            return self._view.rendered_mask(positions)
+        return self._loader.rendered(positions)
+
+    def selection(self) -> tuple:
+        """
+            Override selection, in virtual mode returns the selected rows outside the window too, in display order.
+        """
+        if not self._virtual:
+            return super().selection()
+        return self._virtual.selection()
+
+    def selection_set(self, *items):
+        """
+            Override selection_set, in virtual mode any rows can be selected, not only the ones of the window.
+        """
+        if not self._virtual:
+            return super().selection_set(*items)
+        self._virtual.select("set", items)
+
+    def selection_add(self, *items):
+        """
+            Override selection_add, see selection_set().
+        """
+        if not self._virtual:
+            return super().selection_add(*items)
+        self._virtual.select("add", items)
+
+    def selection_remove(self, *items):
+        """
+            Override selection_remove, see selection_set().
+        """
+        if not self._virtual:
+            return super().selection_remove(*items)
+        self._virtual.select("remove", items)
+
+    def selection_toggle(self, *items):
+        """
+            Override selection_toggle, see selection_set().
+        """
+        if not self._virtual:
+            return super().selection_toggle(*items)
+        self._virtual.select("toggle", items)
+
+    def focus(self, item: str | int | None = None) -> str | int:
+        """
+            Override focus, in virtual mode the focus is kept by iid and may be a row outside the window.
+        """
+        if not self._virtual:
+            return super().focus(item)
+        return self._virtual.focus(item)
+
+    def yview(self, *args):
+        """
+        Override yview, in virtual mode scrolls over the whole display order instead of the Tk items.
+
+        :param args: standard yview arguments ("moveto", fraction) or ("scroll", number, "units"|"pages")
+        :return: (first, last) fractions if called without arguments
+        """
+        if not self._virtual:
+            return super().yview(*args)
+        return self._virtual.yview(*args)
+
+    def yview_moveto(self, fraction: float):
+        """
+            Override yview_moveto, goes through yview().
+        """
+        self.yview("moveto", fraction)
+
+    def yview_scroll(self, number: int, what: str):
+        """
+            Override yview_scroll, goes through yview().
+        """
+        self.yview("scroll", number, what)
+
+    def configure(self, cnf: dict | None = None, **kw):
+        """
+            Override configure, in virtual mode yscrollcommand is kept by the tree and fed by yview().
+        """
+        if self._virtual:
+            kw = dict(cnf or {}, **kw)
+            if "yscrollcommand" in kw:
+                self._virtual.yscrollcommand = kw.pop("yscrollcommand")
+                self._virtual.scroll_notify()
+                if not kw:
+                    return None
+            cnf = None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def destroy(self):
+        """
+            Override destroy, a view leaves its model, collected events are dropped.
+        """
+        if self.model is not None:
+            self.model.detach(self)
+        if self._event_after is not None:
+            self.after_cancel(self._event_after)
+            self._event_after = None
+        super().destroy()
+
+    @property
+    def filtered_df(self) -> pd.DataFrame:
+        """
+        Rows of self.df matching the active filter, an empty dataframe if no filter is applied.
+        The filter itself is kept as a boolean mask over self.df (one byte per row), the frame is derived
+        on the first access after the filter or the data changed and kept until then; every access returns
+        a shallow copy of it. Use snapshot(filtered=True) to get all rows when no filter is applied.
+
+        :return: filtered dataframe
+        """
+        if self._filter_mask is None:
+            return pd.DataFrame()
+        if self._filtered is None or self._filtered[0] is not self.df or self._filtered[1] is not self._filter_mask:
+            self._filtered = self.df, self._filter_mask, self.df[self._filter_mask]
+        return self._filtered[2].copy(deep=False)
+
+    @filtered_df.setter
+    def filtered_df(self, dataframe: pd.DataFrame):
+        """
+        Filters the tree to the rows of the dataframe (matched by index), an empty dataframe removes the filter
+
+        :param dataframe: rows to keep
+        :return: None
+        """
+        self.apply_filter(self.df.index.isin(dataframe.index) if len(dataframe) else None)
+
+    def to_dataframe(self, flags: Literal["bool", "symbol"] = "symbol") -> pd.DataFrame:
+        """
+        Copy of self.df for further work, whatever storage the tree uses for the flag columns
+
+        :param flags: "bool" - flag columns as booleans, "symbol" - as the display symbols
+        :return: dataframe
+        """
+        return self.snapshot(copy=True, flags=flags)
+
+    def snapshot(self, copy: bool = False, flags: Literal["bool", "symbol"] | None = None,
+                 filtered: bool = False) -> pd.DataFrame:
+        """
+        State of the tree as a dataframe indexed by iid.
+        Without copy the data of self.df is shared: with pandas Copy-on-Write (the default from pandas 3)
+        the result is a lazy copy, a later write on either side copies only the written column;
+        with older pandas it is to be treated as read-only and may show later cell writes of the tree.
+        With copy the data is copied at once. Flag columns converted to the other form are new arrays.
+
+        :param copy: copy the data
+        :param flags: "bool" or "symbol" form of the flag columns, None - the storage form of the tree
+        :param filtered: only the rows of the active filter (all rows when no filter is applied)
+        :return: dataframe
+        """
+        self._batch.apply()
+        df = self.df[self._filter_mask] if filtered and self._filter_mask is not None else self.df
+        df = df.copy(deep=copy)
+        if flags is not None and flags != self._flags:
+            convert = self._flags_to_bool if flags == "bool" else self._flags_to_symbols
+            for col in df.columns[1:]:
+                df[col] = convert(df[col])
+        return df
+
+    def to_records(self, flags: Literal["bool", "symbol"] | None = None, filtered: bool = False) -> list[dict]:
+        """
+        State of the tree as a list of rows, built from snapshot() without copying self.df first
+
+        :param flags: "bool" or "symbol" form of the flag columns, None - the storage form of the tree
+        :param filtered: only the rows of the active filter
+        :return: list of dicts {"iid": ..., column: value, ...}
+        """
+        return self.snapshot(flags=flags, filtered=filtered).reset_index(names="iid").to_dict("records")
+
+    def to_arrow(self, flags: Literal["bool", "symbol"] | None = "bool", filtered: bool = False):
+        """
+        State of the tree as an Arrow table with an "iid" column, converted from snapshot()
+        without copying self.df first. Requires pyarrow.
+
+        :param flags: "bool" or "symbol" form of the flag columns, None - the storage form of the tree
+        :param filtered: only the rows of the active filter
+        :return: pyarrow.Table
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as error:
+            raise ImportError("Exporting to Arrow requires pyarrow: pip install tkextras[arrow]") from error
+        return pa.Table.from_pandas(self.snapshot(flags=flags, filtered=filtered).rename_axis("iid"),
+                                    preserve_index=True)
 
     @property
     def svars(self):
         """
-        The attribute that automatically creates a copy _svars, so that each object has an isolated copy
+        The state variables of the tree: an isolated copy of _svars made once per object in __init__,
+        so reading them on hot paths copies nothing
 
         :return: dict, isolated svars
         """
-        return self._svars.copy()
+        return self._svars
+
+    def _display_columns(self) -> list:
+        """
+        Names of the columns shown by the tree, in display order (the displaycolumns option)
+
+        :return: list of column names
+        """
+        columns = list(self.cget("columns"))
+        shown = self.cget("displaycolumns")
+        if isinstance(shown, str):
+            shown = self.tk.splitlist(shown)
+        if not len(shown) or "#all" in shown:
+            return columns
+        return [columns[int(col)] if str(col).isdigit() else str(col) for col in shown]
 
     def column(self, column: str | int, option=None, **kw):
         """
@@ -85,7 +791,11 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         """
         result = super().column(column, option=option, **kw)
         if column not in self.df.columns:
-            self.df[column] = ''
+            self.df[column] = False if self._flags == "bool" and len(self.df.columns) else ''
+            self._filtered = None
+            self._counts = np.pad(self._counts, ((0, 0), (0, 1)))
+            if self._filter_counts is not None:
+                self._filter_counts = np.pad(self._filter_counts, ((0, 0), (0, 1)))
         return result
 
     def insert(self, parent: str, index: int | Literal["end"], iid: str | int | None = None, **kw):
@@ -97,8 +807,18 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
            :param iid: Unique identifier for the row. If None, Treeview generates one.
            :param kw: Additional arguments for Treeview insert (e.g., values).
         """
+        self._loader.flush()
+        self._batch.apply()
+        if "values" in kw:
+            kw["values"] = [self._display_value(col, val) for col, val in zip(self.cget("columns"), kw["values"])]
+        if self._view is not None and not parent:
+            # Rows of the virtual and grouping modes get a Tk item only when they are in the window or open group
+            iid = self._new_iids(1)[0] if iid is None else iid
+            if iid in self.df.index:
+                raise tk.TclError(f"Item {iid} already exists")
+            self._view.place(iid, index)
         # Use the provided iid or let Treeview generate one
-        if iid is None:
+        elif iid is None:
             iid = super().insert(parent, index, **kw)  # Automatically generate iid
         else:
             super().insert(parent, index, iid=iid, **kw)
@@ -107,10 +827,15 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         values = kw.get("values", [])
 
         # Convert values to a DataFrame-compatible dictionary
-        new_row = {col: val for col, val in zip(self.cget("columns"), values)}
+        new_row = {col: self._store_value(col, val) for col, val in zip(self.cget("columns"), values)}
 
         # Add the new row to the DataFrame, using iid as the index
+        replaced = self.df.loc[[iid]] if iid in self.df.index else None
         self.df.loc[iid] = new_row
+        if replaced is None:
+            self._rows_appended(self.df.loc[[iid]], placed=True)
+        else:
+            self._rows_replaced(self.df.loc[[iid]], replaced)
         return iid
 
     def set(self, item: str | int, column: None = None, value: None = None) -> dict[str, Any]:
@@ -122,20 +847,33 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
             :param value: The value to set; if None, retrieves the current value.
             :return: The value as returned by the original Treeview method.
         """
-        result = super().set(item, column, value)
         if item not in self.df.index:
             raise KeyError(f"Row with index '{item}' not found in DataFrame.")
-        is_filtered = True if item in self.filtered_df.index else False
-        if value is None:
+        if value is not None:
+            value = self._display_value(column, value)
+        if self._is_rendered(item):
+            result = super().set(item, column, value)
+        elif value is not None:
+            result = ""
+        elif column is None:
+            result = dict(zip(self.df.columns, self._batch.row_values(item)))
+        else:
+            result = self._batch.value(item, column)
+        if self._batch.active:
+            if value is not None:
+                self._batch.record(item, column, value)
+        elif value is None:
             if column is None:
                 self.df.loc[item] = self.df.loc[item].replace(result)
             else:
-                self.df.loc[item, column] = result
+                stored, old = self._store_value(column, result), self.df.at[item, column]
+                self.df.loc[item, column] = stored
+                self._cell_written(item, column, old, stored)
         else:
-            self.df.loc[item, column] = value
-            if is_filtered:
-                self.filtered_df.loc[item, column] = value
-            ind = self.cget("columns").index(column) if not column else 0
+            stored, old = self._store_value(column, value), self.df.at[item, column]
+            self.df.loc[item, column] = stored
+            self._cell_written(item, column, old, stored)
+            ind = self.cget("columns").index(column) if column else 0
             self.all_checked_update(ind)
         return result
 
@@ -149,29 +887,228 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         :return:
         """
         values = kw.get("values", [])
-        result = super().item(item, option, **kw)  # noqa
-        is_filtered = True if item in self.filtered_df.index else False
-        if option is None and len(values):
-            updates = pd.Series(values, index=self.cget("columns"))
+        if len(values):
+            values = kw["values"] = [self._display_value(col, val) for col, val in zip(self.cget("columns"), values)]
+        if item not in self.df.index or self._is_rendered(item):
+            result = super().item(item, option, **kw)  # noqa
+        else:
+            # Virtual mode: the row has no Tk item, its values come from the DataFrame
+            row = dict(text="", image="", values=self._batch.row_values(item), open=0, tags="")
+            result = row.get(option, "") if option else None if kw else row
+        if option is None and len(values) and self._batch.active:
+            for column, value in zip(self.cget("columns"), values):
+                self._batch.record(item, column, value)
+        elif option is None and len(values) and item in self.df.index:
+            updates = pd.Series([self._store_value(col, val) for col, val in zip(self.cget("columns"), values)],
+                                index=self.cget("columns"), dtype=object)
+            replaced = self.df.loc[[item]]
             self.df.loc[item] = updates
-            if is_filtered:
-                self.filtered_df.loc[item] = updates
+            self._rows_replaced(self.df.loc[[item]], replaced)
             self.all_checked_update()
         return result
 
     def delete(self, *items: str | int, inplace=False):
         """
         Override tk.Treeview delete method with DataFrame synchronization.
+        Rows are located by their iid (the index of self.df), k rows are removed from self.df and the tree
+        with one DataFrame compaction and one Tk call, so they never come back with a rebuild or a filter
+        and their iids can be inserted again. Other items (e.g. group nodes) are deleted from the tree only.
 
-        :param items:
-        :param inplace:
-        :return:
+        :param items: iids of the rows
+        :param inplace: kept for compatibility, the rows are removed from self.df either way
+        :return: None
+        """
+        self._loader.flush()
+        self._batch.apply()
+        positions = self.df.index.get_indexer(pd.Index(items, dtype=object))
+        found = positions[positions >= 0]
+        others = [item for item, position in zip(items, positions) if position < 0]
+        self._rows_removed(found)
+        if others:
+            super().delete(*others)
+
+    def _rows_removed(self, positions: np.ndarray, remaining: pd.DataFrame | None = None) -> pd.DataFrame:
+        """
+        Hook removing rows from self.df and their Tk items: brings the counters, the caches, the filter mask
+        and the search index up to date and passes the removed rows to the collaborators and the display mode
+
+        :param positions: positions of the rows in self.df
+        :param remaining: self.df without the rows if already known (the dataframe of the model)
+        :return: the removed rows
+        """
+        removed = self.df.iloc[positions]
+        keep = np.ones(len(self.df), dtype=bool)
+        keep[positions] = False
+        self._cache_invalidate()
+        self._counts -= self._flag_counts(removed)
+        if self._filter_mask is not None:
+            self._filter_counts -= self._flag_counts(removed[self._filter_mask[positions]])
+            self._filter_mask = self._filter_mask[keep]
+            self._filter_rows = int(self._filter_mask.sum())
+        if self.search_index is not None:
+            self.search_index.remove(removed.index)
+        self.df = self.df[keep] if remaining is None else remaining
+        for part in self._parts:
+            part.rows_removed(removed)
+        if self._view is not None:
+            self._view.rows_removed(removed)
+        else:
+            super().delete(*removed.index[self._loader.rendered(positions)])
+        return removed
+
+    def set_column(self, column: int | str, value: Any, rows: Literal["visible", "all"] | Iterable = "visible"):
+        """
+        Sets one value to a column for many rows at once: a single vectorized DataFrame assignment,
+        batched Tk updates and one <<TreeCheckAllUpdated>> event at the end.
+
+        :param column: column number or name
+        :param value: the value to set, usually one of svars["flag_symbol"] (or a boolean for a flag column)
+        :param rows: "visible" - rows passing the filter, "all" - every row, or an iterable of iids
+        :return: None
+        """
+        self._loader.flush()
+        self._batch.apply()
+        index = column if isinstance(column, int) else self.df.columns.get_loc(column)
+        column = self.df.columns[index]
+        if isinstance(rows, str):
+            positions = np.flatnonzero(self._visible_mask()) if rows == "visible" else np.arange(len(self.df))
+        else:
+            rows = rows if isinstance(rows, pd.Index) else pd.Index(list(rows), dtype=object)
+            positions = self.df.index.get_indexer(rows)
+            if (positions < 0).any():
+                raise KeyError("Rows not found in DataFrame.")
+        iids = self.df.index[positions]
+        value = self._display_value(column, value)
+        self._write_column(index, positions, np.full(len(positions), value, dtype=object))
+        rendered = iids[self._rendered_mask(positions)]
+        self._tcl_bulk("set_cells", column, rendered, [value] * len(rendered))
+        self.all_checked_update(index)
+
+    def _write_column(self, index: int, positions: np.ndarray, values: np.ndarray):
+        """
+        Vectorized write of values to one column of self.df, keeping the counters and the search index in step.
+        Inside a batch the written cells are recorded for last_changes, after a checkpoint for changes_since().
+        The other views of the model receive the written cells.
+
+        :param index: column number
+        :param positions: row positions in self.df
+        :param values: new values, one per position, flags as symbols or in the storage form
+        :return: None
         """
-        if inplace:
-            for item in items:
-                values = self.item(item, "values")  # noqa
-                self.df = self.df[~(self.df[list(self.df.columns)] == values).all(axis=1)]
-        super().delete(*items)
+        if self._flags == "bool" and index:
+            values = self._flags_to_bool(values)
+        old = self.df.iloc[positions, index].to_numpy(copy=True)
+        self.df.iloc[positions, index] = values
+        iids, changed = self._cells_written(index, positions, old, values)
+        self._batch.written(iids[changed], self.df.columns[index], old[changed], values[changed])
+
+    def _cells_written(self, index: int, positions: np.ndarray, old: np.ndarray,
+                       values: np.ndarray) -> tuple[pd.Index, np.ndarray]:
+        """
+        Hook for cells just written to one column of self.df: brings the counters, the caches
+        and the search index up to date and passes the cells to the collaborators and the display mode
+
+        :param index: column number
+        :param positions: row positions in self.df
+        :param old: previous values, in the storage form
+        :param values: new values, in the storage form
+        :return: iids of the rows and the mask of the cells whose value changed
+        """
+        in_filter = self._filter_mask[positions] if self._filter_mask is not None else None
+        for counts, selected in ((self._counts, slice(None)), (self._filter_counts, in_filter)):
+            if counts is not None:
+                counts[:, index] += [
+                    (values[selected] == self._flag_value(kind)).sum() - (old[selected] == self._flag_value(kind)).sum()
+                    for kind in ("check", "uncheck")]
+        self._cache_invalidate(self.df.columns[index])
+        iids = self.df.index[positions]
+        if self.search_index is not None and index == 0:
+            self.search_index.update(iids, values)
+        for part in self._parts:
+            part.cells_written(index, positions, old, values)
+        if self._view is not None:
+            self._view.cells_written(index, positions, old, values)
+        return iids, old != values
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager deferring the DataFrame synchronization and events:
+        with tree.batch(): ...
+
+        Inside a batch, set() and item(values=...) update the Tk cells at once but only record
+        the DataFrame writes. On exit the recorded writes are applied column by column in vectorized steps,
+        the "check all" state is recomputed once and a single <<TreeBatchApplied>> event is generated,
+        last_changes then holds the changed cells (iid, column, old, new).
+
+        Nested batches join the outermost one, which applies the changes.
+        set_column(), insert(), delete(), bulk_insert() and filtering inside a batch first apply
+        the writes recorded so far and then run immediately, only their events are deferred.
+        If an exception leaves a batch, the writes recorded since that batch began and not applied yet
+        are discarded and their Tk cells restored; changes already applied are kept.
+
+        :return: the tree
+        """
+        with self._batch.scope():
+            yield self
+
+    def checkpoint(self, name: str = "default") -> str:
+        """
+        Marks the current state of self.df, changes_since() then lists what changed after it.
+        Setting an existing checkpoint again moves it to the current state.
+        Changes are only recorded while checkpoints exist, the record is kept from the oldest one.
+
+        :param name: name of the checkpoint
+        :return: the name
+        """
+        self._loader.flush()
+        self._batch.apply()
+        self._journal.checkpoint(name)
+        return name
+
+    def release_checkpoint(self, name: str = "default"):
+        """
+        Removes a checkpoint, unknown names are ignored
+
+        :param name: name of the checkpoint
+        :return: None
+        """
+        self._journal.release(name)
+
+    def changes_since(self, name: str = "default", records: bool = False) -> pd.DataFrame | list[dict]:
+        """
+        Net changes of self.df since the checkpoint, computed from the recorded changes only
+        (the cost depends on the number of changes, not on the size of the table).
+        Cell writes (set(), item(), toggle_cell(), set_column(), batches...) are reported per changed cell
+        with the value at the checkpoint and the current one, cells written back to their value are left out.
+        Rows inserted or deleted (delete()) since the checkpoint are reported once per row,
+        without cells: the current values of inserted rows are in self.df.
+        Values are in the storage form of self.df, as in last_changes.
+
+        :param name: name of the checkpoint
+        :param records: return a list of dicts instead of a dataframe
+        :return: changes with the columns iid, column, old, new, change ("update", "insert" or "delete")
+        """
+        self._batch.apply()
+        result = self._journal.since(name)
+        return result.to_dict("records") if records else result
+
+    def event_changes(self, records: bool = False) -> pd.DataFrame | list[dict]:
+        """
+        With events="idle": net changes of self.df made before the events being delivered, for handlers
+        updating incrementally. The changes of the idle cycle are collected with the events and computed
+        into a dataframe on the first call; event_payload holds the names of the delivered events ("events")
+        and the number of rows passing the filter ("filter_rows").
+
+            tree = TreeviewDataFrame(parent, columns=columns, events="idle")
+            tree.bind("<<TreeToggleCell>>", lambda event: refresh(tree.event_changes()))
+
+        :param records: return a list of dicts instead of a dataframe
+        :return: changes with the columns iid, column, old, new, change, as in changes_since()
+        """
+        if self._event_net is None or isinstance(self._event_net, list):
+            self._event_net = ChangeJournal.net_changes(self._event_net or [])
+        return self._event_net.to_dict("records") if records else self._event_net
 
     def flag_inverse(self, value: str) -> str:
         """
@@ -183,46 +1120,591 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         flag_values = self.svars["flag_values"]
         return flag_values[value]
 
-    def toggle_cell(self, event):
+    def _flag_value(self, kind: Literal["check", "uncheck"]) -> Any:
+        """
+        The value self.df holds for the flag
+
+        :param kind: "check" or "uncheck"
+        :return: the symbol, or a boolean in the "bool" storage
+        """
+        if self._flags == "bool":
+            return kind == "check"
+        return self.svars["flag_symbol"][kind]
+
+    def _flags_to_bool(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        """
+        Vectorized conversion of flag values to booleans: the "check" symbol and true values are True
+
+        :param values: symbols or boolean-like values
+        :return: boolean array
+        """
+        values = pd.Series(values, copy=False)
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            return values.fillna(0).astype(bool).to_numpy()
+        return values.isin([self.svars["flag_symbol"]["check"], True]).to_numpy()
+
+    def _flags_to_symbols(self, values: pd.Series | np.ndarray) -> np.ndarray:
+        """
+        Vectorized conversion of boolean flags to the display symbols
+
+        :param values: booleans
+        :return: object array of symbols
+        """
+        symbols = self.svars["flag_symbol"]
+        return np.where(np.asarray(values, dtype=bool), symbols["check"], symbols["uncheck"]).astype(object)
+
+    def _store_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Brings the flag columns (all but the first one) of the frame to the storage form of self.df
+
+        :param frame: rows with the columns of the tree
+        :return: the frame itself in the "symbol" storage, a converted copy in the "bool" storage
+        """
+        if self._flags != "bool" or frame.shape[1] < 2:
+            return frame
+        return pd.DataFrame({col: frame[col].to_numpy() if not i else self._flags_to_bool(frame[col])
+                             for i, col in enumerate(frame.columns)}, index=frame.index)
+
+    def _display_rows(self, frame: pd.DataFrame) -> list[list]:
+        """
+        Rows of the frame as shown in the Tk cells, flags of the "bool" storage become symbols
+
+        :param frame: rows of self.df
+        :return: list of row values
+        """
+        rows = frame.to_numpy(dtype=object)
+        if self._flags == "bool" and frame.shape[1] > 1:
+            rows[:, 1:] = self._flags_to_symbols(frame.iloc[:, 1:].to_numpy(dtype=bool))
+        return rows.tolist()
+
+    def _store_value(self, column: str | None, value: Any) -> Any:
+        """
+        One cell value in the storage form of self.df
+
+        :param column: column name
+        :param value: symbol or boolean-like value
+        :return: value for self.df
+        """
+        if column is None or column == self.df.columns[0]:
+            return value
+        if self._flags != "bool":
+            return self._display_value(column, value)
+        return bool(self._flags_to_bool(np.array([value], dtype=object))[0])
+
+    def _display_value(self, column: str | None, value: Any) -> Any:
+        """
+        One cell value as shown in the Tk cell
+
+        :param column: column name
+        :param value: value of self.df or a value being written, booleans of the flag columns become symbols
+        :return: value for the Tk cell
+        """
+        if column is None or column == self.df.columns[0]:
+            return value
+        if self._flags != "bool" and not isinstance(value, (bool, np.bool_)):
+            return value
+        return self._flags_to_symbols(self._flags_to_bool(np.array([value], dtype=object)))[0]
+
+    def toggle_cell(self, event, extend: bool = False):
         """
         Handles cell clicks to change flags.
+        The row of a plain click becomes the anchor. With extend (Shift-click) in the column of the anchor,
+        all rows shown between the anchor and the clicked row take the flag of the anchor, in one set_column() call.
+        <<TreeToggleCell>> is generated once, last_toggled then holds the iids of the affected rows.
 
         :param event: click coordinates
+        :param extend: toggle the range from the anchor
         :return: None if the click is outside the target area
         """
         if self.identify_region(event.x, event.y) != "cell":
             return
         col_num = int(self.identify_column(event.x).replace("#", "")) - 1
-        if not col_num:
+        columns = self._display_columns()
+        if not 0 <= col_num < len(columns) or columns[col_num] == self.df.columns[0]:
             return
-        col_name = self.cget("columns")[col_num]
+        col_name = columns[col_num]
         item = self.identify_row(event.y)
-        current_value = self.set(item, col_name)
-        self.set(item, col_name, self.flag_inverse(current_value))  # noqa
-        self.event_generate("<<TreeToggleCell>>")
+        self._mark_column = col_name
+        if item in self._grouping.nodes:
+            self._toggled(self.group_toggle(item, col_name))
+            return
+        rows = None
+        if extend and self._anchor is not None and self._anchor[1] == col_name:
+            rows = self._display_range(self._anchor[0], item)
+        if rows is None:
+            current_value = self.set(item, col_name)
+            self.set(item, col_name, self.flag_inverse(current_value))  # noqa
+            self._anchor = (item, col_name)
+            rows = pd.Index([item], dtype=object)
+        else:
+            self.set_column(col_name, self.set(self._anchor[0], col_name), rows=rows)
+        self._toggled(rows)
+
+    def mark_selected(self, column: int | str | None = None) -> pd.Index:
+        """
+        Checks the flags of the selected rows (and of the rows of selected groups), or unchecks them
+        if all are checked, in one set_column() call. Bound to the space key.
+
+        :param column: column number or name, by default the column of the last clicked cell
+            (the first flag column shown before any click)
+        :return: iids of the affected rows
+        """
+        self._batch.apply()
+        index = self._mark_index(column)
+        selection = pd.Index(self.selection(), dtype=object)
+        rows = [selection[selection.isin(self.df.index)]]
+        rows += [self._grouping.rows(item) for item in selection if item in self._grouping.nodes]
+        rows = rows[0].append(rows[1:]).unique()
+        if index is None or not len(rows):
+            return rows[:0]
+        checked = self._flags_to_bool(self.df.iloc[self.df.index.get_indexer(rows), index]).all()
+        self.set_column(index, self.svars["flag_symbol"]["uncheck" if checked else "check"], rows=rows)
+        self._toggled(rows)
+        return rows
+
+    def mark_all(self, column: int | str | None = None) -> pd.Index:
+        """
+        Checks the flags of all rows shown (passing the filter), or unchecks them if all are checked,
+        in one set_column() call. Bound to Control-A.
+
+        :param column: column number or name, by default the column of the last clicked cell
+            (the first flag column shown before any click)
+        :return: iids of the affected rows
+        """
+        self._loader.flush()
+        self._batch.apply()
+        index = self._mark_index(column)
+        if index is None or not len(self.df):
+            return self.df.index[:0]
+        kind = "uncheck" if self.is_all_checked(index) else "check"
+        self.set_column(index, self.svars["flag_symbol"][kind], rows="visible")
+        rows = self.df.index[self._visible_mask()]
+        self._toggled(rows)
+        return rows
+
+    def _mark_key(self, mark: Callable[[], Any]) -> str:
+        """
+        Runs a marking bound to a key, the default handling of the key is skipped
+
+        :param mark: mark_selected or mark_all
+        :return: "break"
+        """
+        mark()
+        return "break"
+
+    def _mark_index(self, column: int | str | None) -> int | None:
+        """
+        Column number of a marking
+
+        :param column: column number or name, None for the column of the last clicked cell
+        :return: column number, None if no flag column is shown
+        """
+        if column is not None:
+            return column if isinstance(column, int) else self.df.columns.get_loc(column)
+        flags = [col for col in self._display_columns() if col != self.df.columns[0]]
+        if self._mark_column in flags:
+            return self.df.columns.get_loc(self._mark_column)
+        return self.df.columns.get_loc(flags[0]) if flags else None
+
+    def _display_range(self, first: str | int, last: str | int) -> pd.Index | None:
+        """
+        Rows shown between two rows, both included, in display order
+
+        :param first: iid of one end
+        :param last: iid of the other end
+        :return: iids, None if one of the rows is not shown
+        """
+        if self._view is not None:
+            return self._view.display_range(first, last)
+        return self._position_range(self._display_positions(self._filter_mask), first, last)
+
+    def _position_range(self, positions: np.ndarray, first: str | int, last: str | int) -> pd.Index | None:
+        """
+        Rows between two rows of a display order, both included
+
+        :param positions: row positions in self.df, in display order
+        :param first: iid of one end
+        :param last: iid of the other end
+        :return: iids, None if one of the rows is not in the order
+        """
+        ends = [np.flatnonzero(positions == position) for position in self.df.index.get_indexer([first, last])]
+        if not all(len(end) for end in ends):
+            return None
+        start, stop = sorted((ends[0][0], ends[1][0]))
+        return self.df.index[positions[start:stop + 1]]
+
+    def _toggled(self, rows: pd.Index):
+        """
+        Generates <<TreeToggleCell>> for flags changed by a click or a key
+
+        :param rows: iids of the affected rows, kept in last_toggled
+        :return: None
+        """
+        self.last_toggled = rows
+        self._event("<<TreeToggleCell>>")
 
     def rebuild_tree(self, dataframe: pd.DataFrame = None):
         """
-        Rebuilds the tree according to the dataframe
+        Rebuilds the tree according to the dataframe: the Tk items are recreated from self.df
+        and only the rows of the dataframe are shown.
+        Rows of the dataframe are matched to self.df by index: known rows take the values of the dataframe,
+        unknown rows are appended with their index as iid.
 
         :param dataframe: dataframe for rebuilding, if empty, self.df is used
         :return: None
         """
-        if dataframe is None:
-            dataframe = self.df
-        self.delete(*self.get_children())
-        for index, row in dataframe.iterrows():
-            self.insert("", "end", iid=str(index), values=row.to_list())
+        self._loader.flush()
+        self._batch.apply()
+        if dataframe is not None:
+            dataframe = self._store_frame(dataframe.reindex(columns=self.df.columns, fill_value=""))
+            known = dataframe.index.isin(self.df.index)
+            rows = dataframe.index[known]
+            if len(rows):
+                replaced = self.df.loc[rows]
+                self.df.loc[rows] = dataframe.loc[rows]
+                self._rows_replaced(self.df.loc[rows], replaced)
+            if not known.all():
+                self._append_frame(dataframe[~known])
+        if self._view is not None:
+            self._view.rebuild()
+        else:
+            super().delete(*self.df.index)
+            self._tcl_bulk("insert", "", self.df.index, self._display_rows(self.df))
+            self._filter_mask = None
+        self.apply_filter(None if dataframe is None else self.df.index.isin(dataframe.index))
+        if self._sort_keys and self._view is None:
+            self._apply_order()
 
     def filter_by_name(self, keyword: str = ""):
         """
         Filter DataFrame rows based on a keyword and update Treeview.
+        With a search index, keywords without regular expression characters are looked up in the index.
+
+        :param keyword: filter string
+        :return: None
+        """
+        self._batch.apply()
+        self.apply_filter(self._name_mask(keyword))
+
+    def _name_mask(self, keyword: str, values: pd.Series | None = None) -> np.ndarray:
+        """
+        Rows whose first column contains the keyword, a case-insensitive regular expression.
+        Keywords without regular expression characters are plain substrings compared after case folding,
+        in the search index when there is one.
 
         :param keyword: filter string
+        :param values: first column to search instead of the one of self.df, without the search index
+            (the live filter passes it to a worker thread)
+        :return: boolean array aligned with the rows
+        """
+        if values is None and self.search_index is not None and not self.REGEX_CHARS.intersection(keyword):
+            mask = np.zeros(len(self.df), dtype=bool)
+            positions = self.df.index.get_indexer(self.search_index.search(keyword))
+            mask[positions[positions >= 0]] = True
+            return mask
+        values = self.df[self.df.columns[0]] if values is None else values
+        if not self.REGEX_CHARS.intersection(keyword):
+            return SearchIndex.fold(values).str.contains(keyword.casefold(), regex=False, na=False).to_numpy(bool)
+        return values.str.contains(keyword, case=False, na=False).to_numpy()
+
+    def filter_by(self, expression: str | FilterExpression):
+        """
+        Filters the rows with a condition over any columns, a query or predicates (see FilterExpression):
+            tree.filter_by('name contains "sales" and 3 is checked and not 5 is checked')
+            tree.filter_by(Contains("name", "sales") & Checked(3) & ~Checked(5))
+
+        :param expression: query or expression
+        :return: None
+        """
+        self.apply_filter(self.filter_mask(expression))
+
+    def filter_mask(self, expression: str | FilterExpression) -> np.ndarray:
+        """
+        Evaluates a filter expression without applying it.
+        Queries are compiled once, the masks of the expression and of its parts are cached
+        until the rows or the columns they read change.
+
+        :param expression: query or expression
+        :return: boolean array aligned with self.df rows
+        """
+        self._loader.flush()
+        self._batch.apply()
+        if isinstance(expression, str):
+            expression = FilterExpression.parse(expression)
+        return self._expression_mask(expression).copy()
+
+    def _expression_mask(self, expression: FilterExpression) -> np.ndarray:
+        """
+        Cached mask of an expression, the oldest masks are dropped beyond FILTER_CACHE
+
+        :param expression: expression
+        :return: boolean array aligned with self.df rows, not to be modified
+        """
+        cached = self._filter_cache.get(expression)
+        if cached is not None:
+            return cached[1]
+        mask = expression.mask(self)
+        columns = {self.df.columns[col] if isinstance(col, int) else col for col in expression.columns()}
+        if len(self._filter_cache) >= self.FILTER_CACHE:
+            del self._filter_cache[next(iter(self._filter_cache))]
+        self._filter_cache[expression] = (columns, mask)
+        return mask
+
+    def apply_filter(self, mask: np.ndarray | None = None):
+        """
+        Shows only the rows of self.df selected by the mask, None shows all rows.
+        Only the rows whose visibility changes are touched: hidden rows are detached,
+        rows coming back are reattached together with the new child order (in the sort order) in one Tk call.
+
+        :param mask: boolean array aligned with self.df rows
+        :return: None
+        """
+        self._loader.flush()
+        self._batch.apply()
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+        visible = self.df.index[self._display_positions(mask)] if self._sort_keys or mask is not None \
+            else self.df.index
+        self._filter_counts = None if mask is None else self._flag_counts(self.df[mask])
+        self._filter_rows = len(visible) if mask is not None else 0
+        if self._view is not None:
+            self._filter_mask = mask
+            self._view.show(visible, 0)
+            return
+        old = self._visible_mask()
+        self._filter_mask = mask
+        new = self._visible_mask()
+        hidden = self.df.index[old & ~new]
+        if len(hidden):
+            self.detach(*hidden)
+        if (new & ~old).any():
+            self.tk.call(self._w, "children", "", tuple(visible))
+
+    def reset_filter(self):
+        """
+        Removes the filter, the hidden rows are reattached.
+
+        :return: None
+        """
+        self.apply_filter(None)
+
+    def _visible_mask(self) -> np.ndarray:
+        """
+        Boolean array of the rows of self.df passing the filter
+
+        :return: mask aligned with self.df rows
+        """
+        if self._filter_mask is None:
+            return np.ones(len(self.df), dtype=bool)
+        return self._filter_mask
+
+    def sort_by(self, columns: str | Iterable[str] | None = None, ascending: bool | Iterable[bool] = True):
+        """
+        Sorts the rows shown by the tree by one or more columns, None restores the order of self.df.
+        self.df keeps its order and the filter keeps applying. Rows changed or added later are not moved
+        until the next sort or filter change.
+
+        The dense codes of every key column (its argsort) are computed once and cached until the column changes,
+        the order of several keys is a lexsort of their codes. The order is applied with one Tk call,
+        in the virtual mode by replacing the display order.
+
+        :param columns: column name or names, the first one is the primary key
+        :param ascending: sort direction, one for all columns or one per column
+        :return: None
+        """
+        self._loader.flush()
+        self._batch.apply()
+        columns = [] if columns is None else [columns] if isinstance(columns, str) else list(columns)
+        ascending = [ascending] * len(columns) if isinstance(ascending, bool) else list(ascending)
+        self._sort_keys = list(zip(columns, ascending))
+        self._sort_order = None
+        self._sort_headings()
+        self._apply_order()
+        self.sort_event_evoke()
+
+    def _sort_headings(self):
+        """
+        Shows ▲/▼ in the headings of the sort key columns
+
+        :return: None
+        """
+        keys = dict(self._sort_keys)
+        for col in self.cget("columns"):
+            text = self.heading(col, "text").removesuffix(" ▲").removesuffix(" ▼")
+            self.heading(col, text=text if col not in keys else f"{text} {'▲' if keys[col] else '▼'}")
+
+    def sort_click(self, event, extend: bool = False):
+        """
+        Handles heading clicks: a click sorts by the column ascending, then descending, then restores the order.
+        With extend (Shift-click) the column is added to the sort keys or its direction is switched.
+
+        :param event: click coordinates
+        :param extend: keep the other sort keys
+        :return: None if the click is outside the headings
+        """
+        if self.identify_region(event.x, event.y) != "heading":
+            return
+        col_num = int(self.identify_column(event.x).replace("#", "")) - 1
+        columns = self._display_columns()
+        if not 0 <= col_num < len(columns):
+            return
+        column = columns[col_num]
+        keys = dict(self._sort_keys) if extend else {col: asc for col, asc in self._sort_keys if col == column}
+        if column not in keys:
+            keys[column] = True
+        elif keys[column]:
+            keys[column] = False
+        else:
+            del keys[column]
+        self.sort_by(list(keys), list(keys.values()))
+
+    def _apply_order(self):
+        """
+        Shows the visible rows in the sort order
+
+        :return: None
+        """
+        visible = self.df.index[self._display_positions(self._filter_mask)]
+        if self._view is not None:
+            self._view.show(visible)
+        else:
+            self.tk.call(self._w, "children", "", tuple(visible))
+
+    def _display_positions(self, mask: np.ndarray | None) -> np.ndarray:
+        """
+        Positions in self.df of the rows selected by the mask, in the sort order
+
+        :param mask: boolean array aligned with self.df rows, None selects all rows
+        :return: array of positions
+        """
+        if not self._sort_keys:
+            return np.arange(len(self.df)) if mask is None else np.flatnonzero(mask)
+        if self._sort_order is None:
+            codes = [self._sort_codes(col, asc) for col, asc in reversed(self._sort_keys)]
+            self._sort_order = np.lexsort(codes)
+        return self._sort_order if mask is None else self._sort_order[mask[self._sort_order]]
+
+    def _sort_codes(self, column: str, ascending: bool = True) -> np.ndarray:
+        """
+        Dense sort codes of the column (equal values share a code), the factorization is cached.
+        Missing values come last in both directions.
+
+        :param column: column name
+        :param ascending: codes of the ascending or of the descending order
+        :return: array aligned with self.df rows
+        """
+        if column not in self._sort_cache:
+            values = self.df[column]
+            try:
+                codes, uniques = pd.factorize(values, sort=True)
+            except TypeError:
+                # values of different types, compared as text
+                codes, uniques = pd.factorize(values.astype(str), sort=True)
+            self._sort_cache[column] = (codes, len(uniques))
+        codes, count = self._sort_cache[column]
+        return np.where(codes < 0, count, codes if ascending else count - 1 - codes)
+
+    def _cache_invalidate(self, column: str | None = None):
+        """
+        Drops the cached sort codes and filter masks of a changed column, and the cached filtered_df
+
+        :param column: column name, None for all columns (rows added or removed)
+        :return: None
+        """
+        self._filtered = None
+        if column is None:
+            self._sort_cache.clear()
+            self._filter_cache.clear()
+        else:
+            self._sort_cache.pop(column, None)
+            for expression in [key for key, (columns, _) in self._filter_cache.items() if column in columns]:
+                del self._filter_cache[expression]
+        if column is None or any(col == column for col, _ in self._sort_keys):
+            self._sort_order = None
+
+    def group_by(self, columns: str | Iterable[str] | None = None):
+        """
+        Grouping mode: the rows are grouped by one or more columns into parent nodes, one level per column,
+        None returns to the flat list. The group nodes get their Tk items at once, the rows of a group
+        only when it is opened (<<TreeviewOpen>>).
+        The flag cells of a node show whether all, none or some (svars["flag_symbol"]["partial"]) of its rows
+        are checked. They follow the changes of the rows, a click on one checks or unchecks the whole group
+        (group_toggle()). Filtering and sorting apply inside the groups; rows whose grouping columns change
+        are not moved until the groups are rebuilt (filter, sort or group_by()), as with sorting.
+        Not available in the virtual mode.
+
+        :param columns: column name or names, the first one is the top level
         :return: None
         """
-        self.filtered_df = self.df[self.df[self.df.columns[0]].str.contains(keyword, case=False)].copy()
-        self.rebuild_tree(self.filtered_df)
+        columns = [] if columns is None else [columns] if isinstance(columns, str) else list(columns)
+        if self._virtual and columns:
+            raise ValueError("Grouping is not available in the virtual mode")
+        missing = [col for col in columns if col not in self.df.columns]
+        if missing:
+            raise KeyError(f"Columns {missing} not found in DataFrame.")
+        self._loader.flush()
+        self._batch.apply()
+        self._grouping.group(columns)
+
+    def group_toggle(self, item: str, column: int | str):
+        """
+        Checks the flags of all rows of the group in the column, or unchecks them if all are checked,
+        in one set_column() call
+
+        :param item: iid of the group node
+        :param column: column number or name
+        :return: iids of the rows of the group
+        """
+        index = column if isinstance(column, int) else self.df.columns.get_loc(column)
+        kind = "uncheck" if self._grouping.all_checked(item, index) else "check"
+        rows = self._grouping.rows(item)
+        self.set_column(index, self.svars["flag_symbol"][kind], rows=rows)
+        return rows
+
+    def _event(self, name: str):
+        """
+        Generates a virtual event of the tree: at once, or with events="idle" once in the next idle cycle
+
+        :param name: event name
+        :return: None
+        """
+        if self._events != "idle":
+            self.event_generate(name)
+            return
+        self._event_pending[name] = None
+        self._event_schedule()
+
+    def _event_schedule(self):
+        """
+        Schedules the delivery of the collected events
+
+        :return: None
+        """
+        if self._event_after is None:
+            self._event_after = self.after_idle(self._event_flush)
+
+    def _event_flush(self):
+        """
+        Delivers the events collected during the idle cycle, each one once, with their payload
+        (see event_changes())
+
+        :return: None
+        """
+        self._event_after = None
+        events, self._event_pending = list(self._event_pending), {}
+        self._event_net, self._journal.collected = self._journal.collected, []
+        self.event_payload = dict(events=events,
+                                  filter_rows=self._filter_rows if self._filter_mask is not None else len(self.df))
+        for name in events:
+            self.event_generate(name)
+
+    def sort_event_evoke(self):
+        """
+        Sort updated event.
+
+        :return: None
+        """
+        self._event("<<TreeSortUpdated>>")
 
     def filter_event_evoke(self):
         """
@@ -230,7 +1712,7 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
 
         :return: None
         """
-        self.event_generate("<<TreeFilterUpdated>>")
+        self._event("<<TreeFilterUpdated>>")
 
     def all_checked_event_evoke(self):
         """
@@ -238,7 +1720,7 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
 
         :return:
         """
-        self.event_generate("<<TreeCheckAllUpdated>>")
+        self._event("<<TreeCheckAllUpdated>>")
 
     def is_all_checked(self, column: int) -> bool:
         """
@@ -247,8 +1729,100 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         :param column: column number
         :return: column status
         """
-        df = self.filtered_df if len(self.filtered_df) else self.df
-        return not len(df[df.iloc[:, column] == self.svars["flag_symbol"]["uncheck"]])
+        return not self.unchecked_count(column, filtered=True)
+
+    def checked_count(self, column: int | str, filtered: bool = False) -> int:
+        """
+        Number of checked cells in the column, answered from the maintained counters
+
+        :param column: column number or name
+        :param filtered: count only the rows of the active filter (all rows if it is empty or not set)
+        :return: number of cells holding the "check" symbol
+        """
+        return int(self._column_counts(column, filtered)[0])
+
+    def unchecked_count(self, column: int | str, filtered: bool = False) -> int:
+        """
+        Number of unchecked cells in the column, answered from the maintained counters
+
+        :param column: column number or name
+        :param filtered: count only the rows of the active filter (all rows if it is empty or not set)
+        :return: number of cells holding the "uncheck" symbol
+        """
+        return int(self._column_counts(column, filtered)[1])
+
+    def _column_counts(self, column: int | str, filtered: bool) -> np.ndarray:
+        """
+        Counters of the column: [checked, unchecked]
+
+        :param column: column number or name
+        :param filtered: use the counters of the active filter, when it holds rows
+        :return: array of two counts
+        """
+        if not isinstance(column, int):
+            column = self.df.columns.get_loc(column)
+        if filtered and self._filter_rows:
+            return self._filter_counts[:, column]
+        return self._counts[:, column]
+
+    def _flag_counts(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Counts the flags of the dataframe from scratch
+
+        :param df: rows to count, with the columns of self.df
+        :return: array (2, columns): numbers of "check" and "uncheck" flags per column
+        """
+        return np.array([[(df[col] == self._flag_value(kind)).sum() for col in df.columns]
+                         for kind in ("check", "uncheck")], dtype=np.int64).reshape(2, len(df.columns))
+
+    def _rows_replaced(self, added: pd.DataFrame, removed: pd.DataFrame):
+        """
+        Hook for rows of self.df given new values in place: brings the counters, the caches
+        and the search index up to date and passes the rows to the collaborators and the display mode
+
+        :param added: new state of the rows, already in self.df
+        :param removed: previous state of the rows, with the same index
+        :return: None
+        """
+        self._cache_invalidate()
+        positions = self.df.index.get_indexer(removed.index)
+        self._counts += self._flag_counts(added) - self._flag_counts(removed)
+        if self._filter_mask is not None:
+            in_filter = self._filter_mask[positions]
+            self._filter_counts += self._flag_counts(added[in_filter]) - self._flag_counts(removed[in_filter])
+        if self.search_index is not None:
+            self.search_index.update(added.index, added.iloc[:, 0])
+        for part in self._parts:
+            part.rows_replaced(added, removed)
+        if self._view is not None:
+            self._view.rows_replaced(added, removed)
+
+    def _cell_written(self, item: str | int, column: str, old: Any, new: Any):
+        """
+        Hook for one cell of self.df just written, the scalar counterpart of _cells_written()
+
+        :param item: iid of the row
+        :param column: column name
+        :param old: previous value
+        :param new: new value
+        :return: None
+        """
+        if old == new:
+            return
+        self._cache_invalidate(column)
+        delta = np.array([int(new == self._flag_value(kind)) - int(old == self._flag_value(kind))
+                          for kind in ("check", "uncheck")], dtype=np.int64)
+        index, position = self.df.columns.get_loc(column), self.df.index.get_loc(item)
+        self._counts[:, index] += delta
+        if self._filter_mask is not None and self._filter_mask[position]:
+            self._filter_counts[:, index] += delta
+        if self.search_index is not None and not index:
+            self.search_index.update([item], [new])
+        old, new = np.array([old], dtype=object), np.array([new], dtype=object)
+        for part in self._parts:
+            part.cells_written(index, np.array([position]), old, new)
+        if self._view is not None:
+            self._view.cells_written(index, np.array([position]), old, new)
 
     def all_checked_update(self, column: int = 0):
         """
@@ -257,36 +1831,48 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         :param column: column number
         :return: None
         """
-        if not len(self.svars["check_all"]):
+        if self._batch.active:
+            self._batch.check = True
             return
-        if column:
-            self.svars['check_all'][column].set(self.is_all_checked(column))  # noqa
-        else:
-            for i in range(1, len(self.cget("columns"))):
-                self.svars['check_all'][i].set(self.is_all_checked(i))  # noqa
+        boxes = self.svars["check_all"]
+        if not len(boxes):
+            return
+        for i in [column] if column else list(boxes):
+            if i in boxes:
+                boxes[i].set(self.is_all_checked(i))  # noqa
         self.all_checked_event_evoke()
 
     @classmethod
-    def transform_df(cls, load_df: pd.DataFrame, first_column: str) -> pd.DataFrame:
+    def transform_df(cls, load_df: pd.DataFrame, first_column: str,
+                     flags: Literal["symbol", "bool"] = "symbol") -> pd.DataFrame:
         """
         Moves the specified column to the first position in the DataFrame.
-        Replace boolean-like values in a DataFrame with custom symbols.
+        Replace boolean-like values in a DataFrame with custom symbols (or booleans).
 
         :param load_df: the dataframe being loaded
         :param first_column: the name of the column that should become the first
+        :param flags: "symbol" - the flag symbols, "bool" - booleans, for a tree with the "bool" storage
         :return: transformed data frame prepared for loading
         """
 
         def replace_boolean_values(df: pd.DataFrame):
             """
-            Replace boolean-like values in a DataFrame with custom symbols
+            Replace boolean-like values in a DataFrame with custom symbols, column by column.
+            Missing values, false values and the strings " ", "_" become "uncheck"
 
             :param df: the dataframe being loaded
             :return: transformed data frame
             """
-            return df.map(
-                lambda x: cls._svars["flag_symbol"]["check"] if pd.notna(x) and bool(x) and x not in {" ", "_"}
-                else cls._svars["flag_symbol"]["uncheck"])
+            result = {}
+            for col in df.columns:
+                values = df[col]
+                if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+                    checked = values.fillna(0).astype(bool).to_numpy()
+                else:
+                    checked = (values.notna() & ~values.isin(["", " ", "_", 0])).to_numpy()
+                result[col] = checked if flags == "bool" else np.where(
+                    checked, cls._svars["flag_symbol"]["check"], cls._svars["flag_symbol"]["uncheck"]).astype(object)
+            return pd.DataFrame(result, index=df.index)
 
         if first_column in load_df.columns:
             col_data = load_df.pop(first_column)
@@ -295,13 +1881,19 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
 
         return load_df
 
-    def filter_widget(self, parent: tk.Widget) -> ttk.Frame:
+    def filter_widget(self, parent: tk.Widget, live: bool = False, delay: int = 300) -> ttk.Frame:
         """
-        Tree filtering widget by word or part of it
+        Tree filtering widget by word or part of it, or by a filter query (see FilterExpression)
         "Filter" button Applies a filter
         "Restore" = clearing the filter value, returning the tree to its original state
 
+        With live, the filter follows the typing: the keystrokes are debounced, the mask of a word is computed
+        in a worker thread (see _run_worker()) and applied in the event loop only if no newer keystroke came
+        meanwhile. Queries and words looked up in the search index are fast and run in the event loop.
+
         :param parent: specify the parent widget
+        :param live: filter while typing
+        :param delay: live filter: ms without keystrokes before filtering
         :return: ttk.Frame element ready to rendering
         """
         widget_frame = ttk.Frame(parent, width=150, borderwidth=1, relief="solid", padding=(2, 2))
@@ -310,26 +1902,106 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
         filter_entry = tk.Entry(widget_frame)
         self.rgrid(filter_entry, dict(row=0, column=1, padx=5, pady=5, sticky="ew"))
 
-        def apply_filter():
+        live_state = dict(after=None, generation=0, running=False, pending=False)
+
+        def text_mask(text: str) -> np.ndarray:
             """
-            Applying a filter
+            Mask of the entry text: a query, otherwise a word or part of it
+
+            """
+            try:
+                return self.filter_mask(text)
+            except (ValueError, KeyError):
+                self._batch.apply()
+                return self._name_mask(text)
 
+        def show(mask: np.ndarray):
             """
-            self.filter_by_name(filter_entry.get())
-            if len(self.filtered_df) == len(self.df):
-                self.filtered_df = pd.DataFrame()
+            Applying a mask, a mask selecting all rows clears the filter
+
+            """
+            self.apply_filter(None if mask.all() else mask)
             self.filter_event_evoke()
             self.all_checked_update()
 
+        def apply_filter():
+            """
+            Applying a filter
+
+            """
+            live_state["generation"] += 1
+            show(text_mask(filter_entry.get()))
+
+        def live_changed(_event=None):
+            """
+            Keystroke in the live mode: results still computed for older text are dropped, filtering is delayed
+
+            """
+            live_state["generation"] += 1
+            if live_state["after"] is not None:
+                self.after_cancel(live_state["after"])
+            live_state["after"] = self.after(delay, live_filter)
+
+        def live_filter():
+            """
+            Live filtering of the entry text, at most one worker at a time
+
+            """
+            live_state["after"] = None
+            if live_state["running"]:
+                live_state["pending"] = True
+                return
+            text, generation = filter_entry.get(), live_state["generation"]
+            try:
+                mask = self.filter_mask(text)
+            except (ValueError, KeyError):
+                self._batch.apply()
+            else:
+                show(mask)
+                return
+            if self.search_index is not None and not self.REGEX_CHARS.intersection(text):
+                show(self._name_mask(text))
+                return
+            frame = self.df
+            values = self.df[self.df.columns[0]]
+
+            def job() -> np.ndarray:
+                try:
+                    return self._name_mask(text, values)
+                except (re.error, ValueError):
+                    # incomplete regular expression while typing
+                    return SearchIndex.fold(values).str.contains(text.casefold(), regex=False, na=False).to_numpy(bool)
+
+            def done(mask: np.ndarray):
+                live_state["running"] = False
+                if live_state["pending"]:
+                    live_state["pending"] = False
+                    live_filter()
+                elif generation == live_state["generation"]:
+                    # rows added or removed meanwhile: filter again in the event loop
+                    show(mask if frame is self.df and len(mask) == len(self.df) else text_mask(text))
+
+            def failed(_error: BaseException):
+                live_state["running"] = live_state["pending"] = False
+
+            live_state["running"] = True
+            self._run_worker(job, done, failed=failed)
+
+        if live:
+            filter_entry.bind("<KeyRelease>", live_changed)
+
         def clear_filter():
             """
             Clearing the filter value, returning the tree to its original state
 
             :return:  None
             """
-            self.rebuild_tree()
+            live_state["generation"] += 1
+            if live_state["after"] is not None:
+                self.after_cancel(live_state["after"])
+                live_state["after"] = None
+            self.reset_filter()
             filter_entry.delete(0, tk.END)
-            self.filtered_df = pd.DataFrame()
             self.filter_event_evoke()
             self.all_checked_update()
 
@@ -341,7 +2013,7 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
 
     def checkbox_widget(self, parent: tk.Widget) -> ttk.Frame:
         """
-        The widget returns "check all" checkboxes for each column, starting with the second one.
+        The widget returns "check all" checkboxes for each column shown, starting with the second one.
         Interactive response to the use of a filter and clicking on cells
 
         :param parent: specify the parent widget
@@ -355,22 +2027,18 @@ class TreeviewDataFrame(WidgetsRender, ttk.Treeview):
             :return: None
             """
             checked = self.svars['check_all'][index].get()  # noqa
-            if not checked:
-                self.svars['check_all'][index].set(False)  # noqa
-            for row in self.get_children():
-                values = list(self.item(row, "values"))  # noqa
-                if checked:
-                    values[index] = self.svars['flag_symbol']['check']
-                else:
-                    values[index] = self.svars['flag_symbol']['uncheck']
-                self.item(row, values=values)
+            self.set_column(index, self.svars['flag_symbol']['check' if checked else 'uncheck'])
 
         widget_frame = ttk.Frame(parent, padding=(2, 2))
 
-        for i, col in enumerate(self.cget("columns")[1:]):
-            ind = i + 1
+        columns = self.cget("columns")
+        for col in self._display_columns():
+            ind = columns.index(col)
+            if not ind:
+                continue
             self.svars["check_all"][ind] = tk.IntVar(value=0)  # noqa
-            box_text = f"Check all {self.heading(col)['text'] if self.heading(col)['text'] else col}"
+            heading = self.heading(col)['text'].removesuffix(" ▲").removesuffix(" ▼")
+            box_text = f"Check all {heading if heading else col}"
             render_params = dict(row=0, column=ind, padx=20)
             self.rgrid(ttk.Checkbutton(widget_frame, text=box_text, variable=self.svars["check_all"][ind],  # noqa
                                        command=lambda k=ind: toggle_all(k)), render_params)
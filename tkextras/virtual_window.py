@@ -0,0 +1,327 @@
+"""
+Contains the implementation of the class VirtualWindow
+
+"""
+from __future__ import annotations
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Literal
+
+from tkextras.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class VirtualWindow:
+    """
+    Virtual mode of TreeviewDataFrame(virtual=True): only the rows around the viewport exist as Tk items.
+
+    The display order (order) holds the iids of all rows shown, the window the ones holding a Tk item:
+    the rows in view plus VIRTUAL_BUFFER rows of the tree on each side. Scrolling moves an offset over the order
+    and recreates the window when it nears its edges. The selection and the focus are kept by iid, so they
+    survive the rows leaving the window. The tree keeps the yscrollcommand, fed with the position of the view
+    in the whole order. The Tk items are handled with the methods of ttk.Treeview, which the tree overrides.
+
+    """
+    def __init__(self, tree, yscrollcommand=None):
+        """
+        Initialization of the window, takes over the Tk scroll command of the tree
+
+        :param tree: TreeviewDataFrame
+        :param yscrollcommand: scroll command given to the tree
+        """
+        self.tree = tree
+        self.order = pd.Index([], dtype=object)
+        self.window = pd.Index([], dtype=object)
+        self.start = 0
+        self.offset = 0
+        self.shown = int(tree.cget("height"))
+        self.selected = {}
+        self.focused = None
+        self.rendering = False
+        self.yscrollcommand = yscrollcommand
+        ttk.Treeview.configure(tree, yscrollcommand=self.scrolled)
+
+    def rows_added(self, frame: pd.DataFrame, placed: bool = False):
+        """
+        Hook: rows appended to the data, shown at the end of the order
+
+        :param frame: the new rows
+        :param placed: the rows already have their place in the order (place())
+        :return: None
+        """
+        if not placed:
+            self.order = self.order.append(frame.index.astype(object))
+        self.render()
+
+    def rows_replaced(self, added: pd.DataFrame, removed: pd.DataFrame):
+        """
+        Hook: rows given new values in place, their Tk cells are written by the tree
+
+        :param added: new state of the rows
+        :param removed: previous state of the rows
+        :return: None
+        """
+
+    def rows_removed(self, removed: pd.DataFrame):
+        """
+        Hook: rows deleted from the data, removed from the order and the window
+
+        :param removed: the deleted rows
+        :return: None
+        """
+        self.order = self.order[~self.order.isin(removed.index)]
+        ttk.Treeview.delete(self.tree, *self.window[self.window.isin(removed.index)])
+        self.window = self.window[~self.window.isin(removed.index)]
+        self.render()
+
+    def cells_written(self, index: int, positions: np.ndarray, old: np.ndarray, values: np.ndarray):
+        """
+        Hook: cells written to one column, their Tk cells are written by the tree
+
+        :param index: column number
+        :param positions: row positions in the data
+        :param old: previous values
+        :param values: new values
+        :return: None
+        """
+
+    def place(self, iid: str | int, index: int | Literal["end"]):
+        """
+        Gives a row being inserted its place in the order
+
+        :param iid: iid of the row
+        :param index: position in the order, "end" to append
+        :return: None
+        """
+        self.order = self.order.insert(len(self.order) if index == "end" else int(index), iid)
+
+    def items(self) -> tuple:
+        """
+        Rows shown, in display order
+
+        :return: tuple of iids
+        """
+        return tuple(self.order)
+
+    def is_rendered(self, item: str | int) -> bool:
+        """
+        Checks whether the row is in the window
+
+        :param item: iid
+        :return: True if the row holds a Tk item
+        """
+        return item in self.window
+
+    def rendered_mask(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Vectorized is_rendered() over rows of the data
+
+        :param positions: row positions in the data
+        :return: boolean array
+        """
+        return self.tree.df.index[positions].isin(self.window)
+
+    def display_range(self, first: str | int, last: str | int) -> pd.Index | None:
+        """
+        Rows of the order between two rows, both included
+
+        :param first: iid of one end
+        :param last: iid of the other end
+        :return: iids, None if one of the rows is not shown
+        """
+        ends = self.order.get_indexer([first, last])
+        if (ends < 0).any():
+            return None
+        return self.order[ends.min():ends.max() + 1]
+
+    def show(self, visible: pd.Index, offset: int | None = None):
+        """
+        Shows the rows in a new order (filter, sort)
+
+        :param visible: iids in display order
+        :param offset: position of the first row in view, the current one if None
+        :return: None
+        """
+        self.order = visible.astype(object)
+        self.render(offset)
+
+    def rebuild(self):
+        """
+        Makes the next render() recreate the Tk items of the window
+
+        :return: None
+        """
+        self.window = self.window[:0]
+
+    def render(self, offset: int | None = None):
+        """
+        Recreates the Tk items for the window of rows around the offset and scrolls the offset row to the top.
+        The selection and the focus are kept by iid and restored on the new items.
+
+        :param offset: position in the order of the first row in view, the current one if None
+        :return: None
+        """
+        tree = self.tree
+        tree._batch.apply()
+        total = len(self.order)
+        if offset is not None:
+            self.offset = offset
+        self.offset = max(0, min(self.offset, total - self.shown))
+        start = max(0, self.offset - tree.VIRTUAL_BUFFER)
+        window = self.order[start:self.offset + self.shown + tree.VIRTUAL_BUFFER]
+        self.rendering = True
+        try:
+            if not window.equals(self.window):
+                self.selection_sync()
+                ttk.Treeview.delete(tree, *tree.get_children())
+                tree._tcl_bulk("insert", "", window, tree._display_rows(tree.df.loc[window]))
+                self.window = window
+                self.selection_restore()
+                if self.offset > start:
+                    tree.update_idletasks()
+            self.start = start
+            ttk.Treeview.yview(tree, "moveto", (self.offset - start) / max(1, len(window)))
+        finally:
+            self.rendering = False
+        self.scroll_notify()
+
+    def selection_sync(self):
+        """
+        Takes the selection and the focus of the Tk items into the ones kept by iid,
+        which also hold the rows outside the window; rows no longer in the data are dropped
+
+        :return: None
+        """
+        tree = self.tree
+        rendered = set(tree.get_children())
+        selected = dict.fromkeys(ttk.Treeview.selection(tree))
+        rows = [iid for iid in self.selected if iid not in rendered]
+        if rows:
+            rows = pd.Index(rows, dtype=object)
+            selected.update(dict.fromkeys(rows[rows.isin(tree.df.index)]))
+        self.selected = selected
+        focus = ttk.Treeview.focus(tree)
+        if focus:
+            self.focused = focus
+        elif self.focused in rendered or self.focused not in tree.df.index:
+            self.focused = None
+
+    def selection_restore(self):
+        """
+        Applies the selection and the focus kept by iid to the Tk items of the window
+
+        :return: None
+        """
+        selected = self.window[self.window.isin(list(self.selected))] if self.selected else self.window[:0]
+        if len(selected) or ttk.Treeview.selection(self.tree):
+            ttk.Treeview.selection_set(self.tree, tuple(selected))
+        if self.focused is not None and self.focused in self.window:
+            ttk.Treeview.focus(self.tree, self.focused)
+
+    def select(self, operation: Literal["set", "add", "remove", "toggle"], items: tuple):
+        """
+        Changes the selection kept by iid, rows outside the window included
+
+        :param operation: as the selection subcommands of ttk.Treeview
+        :param items: iids, or one tuple or list of iids
+        :return: None
+        """
+        if len(items) == 1 and isinstance(items[0], (tuple, list)):
+            items = items[0]
+        missing = [item for item in items if item not in self.tree.df.index]
+        if missing:
+            raise tk.TclError(f"Item {missing[0]} not found")
+        self.selection_sync()
+        if operation == "set":
+            self.selected = {}
+        for item in items:
+            if operation in ("set", "add") or operation == "toggle" and item not in self.selected:
+                self.selected[item] = None
+            else:
+                self.selected.pop(item, None)
+        self.selection_restore()
+
+    def selection(self) -> tuple:
+        """
+        Selected rows, in display order, the ones outside the window included
+
+        :return: tuple of iids
+        """
+        self.selection_sync()
+        if not self.selected:
+            return ()
+        positions = self.order.get_indexer(pd.Index(list(self.selected), dtype=object))
+        return tuple(self.order[np.sort(positions[positions >= 0])])
+
+    def focus(self, item: str | int | None = None) -> str | int | None:
+        """
+        Focus kept by iid, it may be a row outside the window
+
+        :param item: iid to focus, None to query the focus
+        :return: the focused iid or "" when querying
+        """
+        self.selection_sync()
+        if item is None:
+            return "" if self.focused is None else self.focused
+        if item not in self.tree.df.index:
+            raise tk.TclError(f"Item {item} not found")
+        self.focused = item
+        if item in self.window:
+            ttk.Treeview.focus(self.tree, item)
+        return None
+
+    def scrolled(self, first: str, last: str):
+        """
+        Tk scroll command of the window.
+        Tracks scrolling made by Tk itself (mouse wheel, keyboard), moves the window when it nears its edges.
+
+        :param first: top fraction of the window in view
+        :param last: bottom fraction of the window in view
+        :return: None
+        """
+        if self.rendering:
+            return
+        size = len(self.window)
+        self.shown = max(int(self.tree.cget("height")), round((float(last) - float(first)) * size))
+        self.offset = self.start + round(float(first) * size)
+        margin = self.tree.VIRTUAL_BUFFER // 2
+        near_top = self.start and self.offset - self.start < margin
+        near_bottom = self.start + size < len(self.order) and self.start + size - self.offset - self.shown < margin
+        if near_top or near_bottom:
+            self.render()
+        else:
+            self.scroll_notify()
+
+    def scroll_notify(self):
+        """
+        Reports the position of the view in the whole order to the yscrollcommand
+
+        :return: None
+        """
+        if self.yscrollcommand is None:
+            return
+        first, last = self.yview()
+        if callable(self.yscrollcommand):
+            self.yscrollcommand(first, last)
+        else:
+            self.tree.tk.call(*self.tree.tk.splitlist(self.yscrollcommand), first, last)
+
+    def yview(self, *args):
+        """
+        Scrolls over the whole order instead of the Tk items
+
+        :param args: standard yview arguments ("moveto", fraction) or ("scroll", number, "units"|"pages")
+        :return: (first, last) fractions if called without arguments
+        """
+        total = max(1, len(self.order))
+        if not args:
+            return self.offset / total, min(1.0, (self.offset + self.shown) / total)
+        if args[0] == "moveto":
+            offset = int(float(args[1]) * total)
+        else:
+            offset = self.offset + int(args[1]) * (self.shown if str(args[2]).startswith("page") else 1)
+        self.render(offset)
+        return None
@@ -0,0 +1,145 @@
+"""
+Contains the implementation of the class WidgetPool
+
+"""
+from __future__ import annotations
+
+import tkinter as tk
+import weakref
+from collections import OrderedDict
+
+
+class WidgetPool:
+    """
+    Released widgets kept for reuse by WidgetsRender, so a rebuilt form reconfigures widgets
+    instead of destroying and creating them again.
+
+        form.widget_pool = WidgetPool(maxsize=500)
+        entry = form.rgrid(ttk.Entry, dict(row=0, column=1), options=dict(width=30))
+        ...
+        form.release(*form.winfo_children())    # forgotten by the geometry manager and pooled
+
+    A widget is reused for the same parent, widget class and option names, its options are set again
+    with the new values. Bindings and options set outside the pool are kept by a reused widget.
+    The pool holds at most maxsize released widgets, the least recently released ones are destroyed first.
+
+    """
+    def __init__(self, maxsize: int = 1000):
+        """
+        Initialization of the pool
+
+        :param maxsize: maximum number of released widgets kept
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._keys = weakref.WeakKeyDictionary()
+        self._free = {}
+        self._lru = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Usage of the pool
+
+        :return: dictionary with hits, misses, evictions, hit_rate and size (widgets kept)
+        """
+        requests = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    hit_rate=self.hits / requests if requests else 0.0, size=len(self._lru))
+
+    @staticmethod
+    def _key(master: tk.Misc, widget_class: type, options: dict) -> tuple:
+        """
+        Pool key of a widget
+
+        :param master: parent
+        :param widget_class: class of the widget
+        :param options: options of the widget
+        :return: hashable key
+        """
+        return str(master), widget_class, tuple(sorted(options))
+
+    def acquire(self, master: tk.Misc, widget_class: type, options: dict | None = None) -> tk.Widget:
+        """
+        Returns a released widget reconfigured with the options, or a new one
+
+        :param master: parent
+        :param widget_class: class of the widget, e.g. ttk.Entry
+        :param options: options of the widget
+        :return: widget, not managed by a geometry manager
+        """
+        options = options or {}
+        key = self._key(master, widget_class, options)
+        free = self._free.get(key)
+        while free:
+            widget, _ = free.popitem()
+            del self._lru[widget]
+            if not free:
+                del self._free[key]
+            if not widget.winfo_exists():
+                # destroyed with its parent
+                self._keys.pop(widget, None)
+                continue
+            self.hits += 1
+            if options:
+                widget.configure(**options)
+            # the stacking order gives the focus traversal order, as for a new widget;
+            # not widget.lift(), which is tag_raise() for a Canvas
+            tk.Misc.tkraise(widget)
+            return widget
+        self.misses += 1
+        widget = widget_class(master, **options)
+        self._keys[widget] = key
+        return widget
+
+    def release(self, widget: tk.Widget) -> bool:
+        """
+        Removes a widget from its geometry manager and keeps it for reuse
+
+        :param widget: widget returned by acquire()
+        :return: False if the widget does not come from the pool (it is left unchanged)
+        """
+        key = self._keys.get(widget)
+        if key is None:
+            return False
+        if widget in self._lru:
+            return True
+        manager = widget.winfo_manager()
+        if manager in ("grid", "pack", "place"):
+            widget.tk.call(manager, "forget", widget._w)
+        self._free.setdefault(key, OrderedDict())[widget] = None
+        self._lru[widget] = key
+        while len(self._lru) > self.maxsize:
+            self._evict()
+        return True
+
+    def _evict(self):
+        """
+        Destroys the least recently released widget
+
+        :return: None
+        """
+        widget, key = self._lru.popitem(last=False)
+        del self._free[key][widget]
+        if not self._free[key]:
+            del self._free[key]
+        self._keys.pop(widget, None)
+        self.evictions += 1
+        widget.destroy()
+
+    def clear(self):
+        """
+        Destroys all released widgets, the statistics are kept
+
+        :return: None
+        """
+        for widget in self._lru:
+            self._keys.pop(widget, None)
+            widget.destroy()
+        self._lru.clear()
+        self._free.clear()
@@ -23,6 +23,7 @@ class WidgetsRender:
         if render_params is None:
             render_params = dict(sticky="ew", padx=5, pady=2)
         self.__render_params = render_params
+        self.widget_pool = None
 
     def param_prepare(self, pack_params: dict | None = None, func: str = "grid") -> dict:
         """
@@ -44,38 +45,161 @@ class WidgetsRender:
         united_pack_params.update(pack_params)
         return united_pack_params
 
-    def rgrid(self, obj: tk.Widget, render_params=None):
+    def rgrid(self, obj: tk.Widget | type, render_params=None, options: dict | None = None):
         """
         Implementation of the tk.Widget.grid() method as a wrapper function
 
-        :param obj: Element to rendering
+        :param obj: Element to rendering, or a widget class: the element is then created with the options
+            (or taken from widget_pool, see release())
         :param render_params: Dictionary with element parameters
+        :param options: options of the element when obj is a widget class
         :return: Rendered element
         """
+        obj = self._render_object(obj, options)
         if obj:
             obj.grid(self.param_prepare(render_params, "grid"))
         return obj
 
-    def rpack(self, obj: tk.Widget, render_params=None):
+    def rpack(self, obj: tk.Widget | type, render_params=None, options: dict | None = None):
         """
         Implementation of the tk.Widget.pack() method as a wrapper function
 
         :param obj: Element to rendering
         :param render_params: Dictionary with element parameters
+        :param options: options of the element when obj is a widget class
         :return: Rendered element
         """
+        obj = self._render_object(obj, options)
         if obj:
             obj.pack(self.param_prepare(render_params, "pack"))
         return obj
 
-    def rplace(self, obj: tk.Widget, render_params=None):
+    def rplace(self, obj: tk.Widget | type, render_params=None, options: dict | None = None):
         """
         Implementation of the tk.Widget.place() method as a wrapper function.
 
         :param obj: Element to rendering
         :param render_params: Dictionary with element parameters
+        :param options: options of the element when obj is a widget class
         :return: Rendered element
         """
+        obj = self._render_object(obj, options)
         if obj:
             obj.place(self.param_prepare(render_params, "place"))
         return obj
+
+    def _render_object(self, obj: tk.Widget | type, options: dict | None = None, master: tk.Misc | None = None):
+        """
+        The element to render: obj itself, or for a widget class a widget from widget_pool or a new one,
+        or for another factory the widget it returns
+
+        :param obj: element, widget class or factory called with the parent and the options
+        :param options: options of the widget
+        :param master: parent of the widget, self by default
+        :return: element
+        """
+        if isinstance(obj, tk.Misc) or not callable(obj):
+            return obj
+        master = self if master is None else master
+        if isinstance(obj, type) and self.widget_pool is not None:
+            return self.widget_pool.acquire(master, obj, options)
+        return obj(master, **(options or {}))
+
+    def release(self, *widgets: tk.Widget):
+        """
+        Removes elements from the form. With a widget_pool (WidgetPool) the elements it created are forgotten
+        by their geometry manager and kept for reuse by rgrid(), rpack(), rplace() and render_layout() with
+        a widget class, the other elements are destroyed.
+
+        :param widgets: elements
+        :return: None
+        """
+        for widget in widgets:
+            if self.widget_pool is None or not self.widget_pool.release(widget):
+                widget.destroy()
+
+    def render_layout(self, spec: list, styles: dict | None = None, row: int = 0, column: int = 0) -> dict:
+        """
+        Creates and grids a whole form from a declarative spec in one pass. The render parameters are merged
+        once per style, not per widget, and the widgets are gridded once all of them are created.
+
+            buttons = [[(ttk.Button, dict(text="OK")), (ttk.Button, dict(text="Cancel"))]]
+            widgets = form.render_layout([
+                [(ttk.Label, dict(text="Name")), dict(widget=ttk.Entry, name="name", params=dict(sticky="we"))],
+                [None, dict(widget=ttk.Frame, layout=buttons)],
+            ], styles=dict(Label=dict(sticky="w")))
+            widgets["name"].focus_set()
+
+        The spec is a list of rows, a row is a list of cells placed in consecutive columns (after a columnspan).
+        A cell is None (empty column), a widget factory called with the parent (a widget class, taken from
+        widget_pool if set, or a function),
+        a tuple (factory, options[, params]) or a dict with the keys:
+            widget - factory, options - options of the factory, params - grid parameters of the cell
+            (row and column override the position of this cell only, the next cells of the row keep their columns),
+            style - name in styles (by default the factory name,
+            e.g. "Label"), name - key of the widget in the result, layout - spec of the children of the widget.
+
+        :param spec: rows of cells
+        :param styles: grid parameters per style, merged over the render parameters of the object
+        :param row: first row
+        :param column: first column
+        :return: dictionary of the named widgets
+        """
+        placements = []
+        named = {}
+        self._layout_build(self, spec, styles or {}, {}, placements, named, row, column)
+        for window, options in placements:
+            self.tk.call("grid", "configure", window, *options)
+        return named
+
+    def _layout_build(self, master: tk.Misc, spec: list, styles: dict, prepared: dict, placements: dict,
+                      named: dict, row: int = 0, column: int = 0):
+        """
+        Creates the widgets of a spec (see render_layout()) and collects their grid options
+
+        :param master: parent of the widgets
+        :param spec: rows of cells
+        :param styles: grid parameters per style
+        :param prepared: merged parameters and their Tcl options per style, filled on first use
+        :param placements: widget paths with their grid options, filled
+        :param named: named widgets, filled
+        :param row: first row
+        :param column: first column
+        :return: None
+        """
+        for row_number, cells in enumerate(spec, row):
+            column_number = column
+            for cell in cells:
+                if cell is None:
+                    column_number += 1
+                    continue
+                if isinstance(cell, tuple):
+                    cell = dict(zip(("widget", "options", "params"), cell))
+                elif not isinstance(cell, dict):
+                    cell = dict(widget=cell)
+                style = cell.get("style", getattr(cell["widget"], "__name__", None))
+                if style not in prepared:
+                    params = self.param_prepare(styles.get(style), "grid")
+                    prepared[style] = params, self._grid_options(params)
+                params, style_options = prepared[style]
+                widget = self._render_object(cell["widget"], cell.get("options"), master)
+                if cell.get("params"):
+                    params = {**params, "row": row_number, "column": column_number, **cell["params"]}
+                    placements.append((str(widget), self._grid_options(params)))
+                else:
+                    placements.append((str(widget), ("-row", row_number, "-column", column_number) + style_options))
+                if "layout" in cell:
+                    self._layout_build(widget, cell["layout"], styles, prepared, placements, named)
+                if "name" in cell:
+                    named[cell["name"]] = widget
+                column_number += int(params.get("columnspan", 1))
+
+    @staticmethod
+    def _grid_options(params: dict) -> tuple:
+        """
+        Grid parameters as Tcl options, "in_" becomes "-in"
+
+        :param params: grid parameters
+        :return: tuple of option names and values
+        """
+        return tuple(item for key, value in params.items() for item in (f"-{key.rstrip('_')}", value))